@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import datetime_to_epoch
+
+from reviews.models import User
+from reviews.versions import get_last_modified, remember_last_modified
+
+ROLE_CLAIM = 'role'
+ISSUED_AT_CLAIM = 'iat'
+# Кэши, которые не видны другим процессам.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """Кэш по умолчанию общий для всех процессов приложения."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def token_for_user(user):
+    """Токен доступа с ролью пользователя в claims."""
+    token = AccessToken.for_user(user)
+    token[ISSUED_AT_CLAIM] = datetime_to_epoch(token.current_time)
+    token['username'] = user.username
+    token[ROLE_CLAIM] = user.role
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    return token
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь из токена: права проверяются без запроса к базе."""
+
+    @cached_property
+    def role(self):
+        return self.token.get(ROLE_CLAIM, User.USER)
+
+    @property
+    def is_moderator(self):
+        return self.role == User.MODERATOR
+
+    @property
+    def is_admin(self):
+        return self.role == User.ADMIN or self.is_superuser or self.is_staff
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по JWT без загрузки пользователя из базы.
+    Пользователь загружается из базы, если токен выдан до роли в claims,
+    или если роль, права или активность пользователя менялись
+    после выдачи токена (при включенном JWT_ROLE_CHANGE_CHECK).
+    Время изменения берется из кэша, а если его там нет — из базы,
+    после чего оно кэшируется на JWT_ROLE_CHANGE_TTL секунд.
+    С кэшем в памяти процесса пользователь всегда загружается из базы:
+    изменение прав в другом воркере не оставило бы в нем отметки,
+    и пониженный или удаленный пользователь сохранил бы права
+    до истечения токена.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_STATELESS_AUTH or not cache_is_shared() or (
+            ROLE_CLAIM not in validated_token
+        ):
+            return super().get_user(validated_token)
+        if not settings.JWT_ROLE_CHANGE_CHECK:
+            return RoleTokenUser(validated_token)
+        item = (User, validated_token.get('user_id'))
+        changed_at = get_last_modified(item)
+        if changed_at is None:
+            # Отметки нет: вытеснена, процесс перезапущен или изменение
+            # было в другом процессе. Проверяем по базе.
+            user = super().get_user(validated_token)
+            changed_at = user.token_fields_changed_at
+            remember_last_modified(
+                item, changed_at.timestamp() if changed_at else 0,
+                settings.JWT_ROLE_CHANGE_TTL,
+            )
+            return user
+        if changed_at >= validated_token.get(ISSUED_AT_CLAIM, 0):
+            return super().get_user(validated_token)
+        return RoleTokenUser(validated_token)
@@ -0,0 +1,51 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from reviews.versions import get_versions
+
+from .metrics import (RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES,
+                      counter_total)
+
+RESPONSE_KEY = 'response:{}'
+
+
+def response_cache_key(request, models):
+    """
+    Ключ кэша ответа: схема, хост и путь, отсортированные непустые
+    параметры запроса и текущие версии моделей, от которых зависит ответ.
+    Схема и хост нужны, потому что ссылки next/previous абсолютные.
+    """
+    params = sorted(
+        (name, sorted(value for value in values if value))
+        for name, values in request.query_params.lists()
+    )
+    raw = repr((
+        request.scheme,
+        request.get_host(),
+        request.path,
+        [(name, values) for name, values in params if values],
+        get_versions(*models),
+    ))
+    return RESPONSE_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_cached_response(key):
+    data = cache.get(key)
+    if data is None:
+        RESPONSE_CACHE_MISSES.inc()
+    else:
+        RESPONSE_CACHE_HITS.inc()
+    return data
+
+
+def set_cached_response(key, data):
+    cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def cache_stats():
+    return {
+        'hits': counter_total(RESPONSE_CACHE_HITS),
+        'misses': counter_total(RESPONSE_CACHE_MISSES),
+    }
@@ -0,0 +1,66 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from reviews.models import Comment, Review, Title
+
+TITLE_FIELDS = (
+    'id', 'name', 'year', 'description', 'category__slug',
+    'rating', 'rating_count',
+)
+REVIEW_FIELDS = (
+    'id', 'title_id', 'author__username', 'text', 'score', 'pub_date',
+)
+COMMENT_FIELDS = (
+    'id', 'review_id', 'author__username', 'text', 'pub_date',
+)
+
+
+def to_line(kind, fields, row):
+    record = {'type': kind}
+    record.update(
+        (field.replace('__', '_'), value)
+        for field, value in zip(fields, row)
+    )
+    return json.dumps(record, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_titles(chunk_size):
+    """
+    Произведения частями по первичному ключу.
+    Жанры каждой части загружаются одним запросом.
+    """
+    last_id = 0
+    while True:
+        rows = list(
+            Title.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list(*TITLE_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            return
+        genres = {}
+        for title_id, slug in Title.genre.through.objects.filter(
+            title_id__in=[row[0] for row in rows]
+        ).values_list('title_id', 'genre__slug'):
+            genres.setdefault(title_id, []).append(slug)
+        for row in rows:
+            yield row + (genres.get(row[0], []),)
+        last_id = rows[-1][0]
+
+
+def export_lines(chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """
+    Строки jsonl со всеми произведениями, отзывами и комментариями.
+    Память не зависит от размера таблиц.
+    """
+    for row in iter_titles(chunk_size):
+        yield to_line('title', TITLE_FIELDS + ('genre',), row)
+    for model, kind, fields in (
+        (Review, 'review', REVIEW_FIELDS),
+        (Comment, 'comment', COMMENT_FIELDS),
+    ):
+        for row in model.objects.order_by('pk').values_list(
+            *fields
+        ).iterator(chunk_size=chunk_size):
+            yield to_line(kind, fields, row)
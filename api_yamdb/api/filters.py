@@ -1,18 +1,82 @@
+from django.db.models import Count
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 from reviews.models import Title
+from reviews.search import search_titles
+from reviews.taxonomy import categories, genres
+
+GENRE_MODES = (
+    ('any', 'Хотя бы один из жанров'),
+    ('all', 'Все жанры'),
+)
 
 
 class FilterForTitle(filters.FilterSet):
     """
     Фильтр произведений по названию, категории и жанров по слагу.
+    Слаги переводятся в id по кэшу reviews.taxonomy, поэтому
+    фильтр по категории и жанру обходится без соединения таблиц.
+    Параметр search — полнотекстовый поиск с сортировкой по релевантности.
+    В genre можно передать несколько слагов через запятую,
+    genre_mode=all оставляет произведения со всеми этими жанрами.
     """
     name = filters.CharFilter(field_name='name',
                               lookup_expr='contains')
-    category = filters.CharFilter(field_name='category__slug',
-                                  lookup_expr='exact')
-    genre = filters.CharFilter(field_name='genre__slug',
-                               lookup_expr='exact')
+    category = filters.CharFilter(method='filter_category')
+    genre = filters.CharFilter(method='filter_genre')
+    genre_mode = filters.ChoiceFilter(choices=GENRE_MODES,
+                                      method='filter_genre_mode')
+    year__gte = filters.NumberFilter(field_name='year',
+                                     lookup_expr='gte')
+    year__lte = filters.NumberFilter(field_name='year',
+                                     lookup_expr='lte')
+    rating_min = filters.NumberFilter(field_name='rating',
+                                      lookup_expr='gte')
+    rating_max = filters.NumberFilter(field_name='rating',
+                                      lookup_expr='lte')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('name', 'category', 'genre', 'year',)
+        fields = ('name', 'category', 'genre', 'genre_mode', 'year',
+                  'year__gte', 'year__lte', 'rating_min', 'rating_max',
+                  'search',)
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(category_id__in=categories().ids([value]))
+
+    def filter_genre(self, queryset, name, value):
+        slugs = list(dict.fromkeys(slug for slug in value.split(',') if slug))
+        if not slugs:
+            return queryset
+        links = Title.genre.through.objects.filter(
+            genre_id__in=genres().ids(slugs)
+        )
+        if self.form.cleaned_data.get('genre_mode') == 'all':
+            links = links.values('title_id').annotate(
+                genres=Count('genre_id')
+            ).filter(genres=len(slugs))
+        return queryset.filter(pk__in=links.values('title_id'))
+
+    def filter_genre_mode(self, queryset, name, value):
+        # Учитывается в filter_genre.
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+
+class TitleOrderingFilter(OrderingFilter):
+    """
+    Дополняет сортировку полем id в направлении первого поля:
+    порядок страниц устойчив при равных значениях,
+    а составной индекс (поле, id) читается без сортировки.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering or any(
+            field.lstrip('-') in ('id', 'pk') for field in ordering
+        ):
+            return ordering
+        return [*ordering, '-id' if ordering[0].startswith('-') else 'id']
@@ -0,0 +1,191 @@
+"""
+Метрики производительности запросов.
+MetricsMiddleware измеряет время ответа, количество и время SQL-запросов,
+время сериализации и размер ответа. Метрики отдаются клиенту
+в заголовке Server-Timing и копятся в памяти процесса в счетчиках
+prometheus_client по именам маршрутов (titles-list, reviews-detail и т.д.).
+Кэш Django для метрик не используется: в нем хранятся версии моделей
+и отметки отзыва токенов, которые нельзя вытеснять счетчиками.
+Под gunicorn задайте PROMETHEUS_MULTIPROC_DIR: каждый воркер пишет
+счетчики в свой файл, /metrics складывает их по всем воркерам.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from prometheus_client import (REGISTRY, CollectorRegistry, Counter,
+                               Histogram, generate_latest, multiprocess)
+
+logger = logging.getLogger('api.slow_requests')
+
+UNMATCHED_ROUTE = 'unmatched'
+# Границы гистограммы времени ответа, секунды.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUESTS = Counter(
+    'yamdb_requests', 'Количество запросов.', ('route',)
+)
+DB_QUERIES = Counter(
+    'yamdb_db_queries', 'Количество SQL-запросов.', ('route',)
+)
+DB_DURATION = Counter(
+    'yamdb_db_duration_seconds', 'Суммарное время SQL-запросов.',
+    ('route',)
+)
+SERIALIZE_DURATION = Counter(
+    'yamdb_serializer_duration_seconds', 'Суммарное время сериализации.',
+    ('route',)
+)
+RESPONSE_BYTES = Counter(
+    'yamdb_response_bytes', 'Суммарный размер ответов.', ('route',)
+)
+REQUEST_DURATION = Histogram(
+    'yamdb_request_duration_seconds', 'Время ответа.', ('route',),
+    buckets=BUCKETS,
+)
+RESPONSE_CACHE_HITS = Counter(
+    'yamdb_response_cache_hits', 'Попадания в кэш ответов.'
+)
+RESPONSE_CACHE_MISSES = Counter(
+    'yamdb_response_cache_misses', 'Промахи кэша ответов.'
+)
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Метрики одного запроса, заодно обертка выполнения SQL."""
+
+    def __init__(self, keep_queries=False):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.keep_queries = keep_queries
+        self.executed = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if self.keep_queries:
+                self.executed.append((elapsed, sql, params))
+
+
+def current_metrics():
+    return getattr(_local, 'metrics', None)
+
+
+class TimedSerializerMixin:
+    """
+    Учитывает время to_representation в метриках запроса.
+    Вложенные сериализаторы не считаются повторно.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_metrics()
+        if metrics is None or getattr(_local, 'serializing', False):
+            return super().to_representation(instance)
+        _local.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize_time += time.perf_counter() - started
+            _local.serializing = False
+
+
+def server_timing(metrics, total):
+    return ', '.join((
+        f'total;dur={total * 1000:.1f}',
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} sql"',
+        f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+    ))
+
+
+def record(route, metrics, total, size):
+    """Добавляет метрики запроса к счетчикам маршрута."""
+    REQUESTS.labels(route).inc()
+    DB_QUERIES.labels(route).inc(metrics.queries)
+    DB_DURATION.labels(route).inc(metrics.db_time)
+    SERIALIZE_DURATION.labels(route).inc(metrics.serialize_time)
+    RESPONSE_BYTES.labels(route).inc(size)
+    REQUEST_DURATION.labels(route).observe(total)
+
+
+def log_slow_request(request, route, metrics, total):
+    queries = '\n'.join(
+        f'  {elapsed * 1000:.1f} мс: {sql} {params!r}'
+        for elapsed, sql, params in metrics.executed
+    )
+    logger.warning(
+        'Медленный запрос %s %s (%s): %.0f мс, SQL: %d за %.0f мс\n%s',
+        request.method, request.get_full_path(), route, total * 1000,
+        metrics.queries, metrics.db_time * 1000, queries,
+    )
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики каждого запроса.
+    При SLOW_REQUEST_MS > 0 запросы дольше порога пишутся в лог
+    api.slow_requests вместе со списком SQL-запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics(keep_queries=settings.SLOW_REQUEST_MS > 0)
+        _local.metrics = metrics
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total = time.perf_counter() - metrics.started
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else (
+            UNMATCHED_ROUTE
+        )
+        size = 0 if response.streaming else len(response.content)
+        response['Server-Timing'] = server_timing(metrics, total)
+        record(route, metrics, total, size)
+        if 0 < settings.SLOW_REQUEST_MS <= total * 1000:
+            log_slow_request(request, route, metrics, total)
+        return response
+
+
+def collecting_registry():
+    """Реестр для выдачи: по всем воркерам, если задан каталог метрик."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def counter_total(counter):
+    """Значение счетчика без меток, сложенное по всем воркерам."""
+    name = f'{counter.describe()[0].name}_total'
+    return int(sum(
+        sample.value
+        for metric in collecting_registry().collect()
+        for sample in metric.samples
+        if sample.name == name
+    ))
+
+
+def prometheus_text():
+    """Все метрики в текстовом формате Prometheus."""
+    return generate_latest(collecting_registry())
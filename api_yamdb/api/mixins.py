@@ -1,10 +1,135 @@
-from rest_framework import filters, mixins, viewsets
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import filters, mixins, response, viewsets
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import SAFE_METHODS
+
+from api_yamdb.routers import replica_may_lag
+from reviews.versions import get_last_modified, get_versions
 
+from .cache import (get_cached_response, response_cache_key,
+                    set_cached_response)
 from .permissions import IsAdminOrReadOnly
+from .serializers import requested_fields
+
+
+class ConditionalResponse(Exception):
+    """Прерывает обработку запроса готовым ответом 304 или 412."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 Not Modified на условные GET-запросы.
+    ETag и Last-Modified строятся по версиям моделей
+    из conditional_models, без сериализации ответа.
+    Пока реплика может отставать от изменений, ETag не выдается.
+    """
+    conditional_models = ()
+
+    def get_conditional_models(self):
+        return self.conditional_models
+
+    def get_etag(self, request):
+        raw = repr((
+            request.get_full_path(),
+            request.user.pk,
+            get_versions(*self.get_conditional_models()),
+        ))
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        models = self.get_conditional_models()
+        if request.method not in ('GET', 'HEAD') or replica_may_lag(*models):
+            return
+        self.etag = self.get_etag(request)
+        self.last_modified = get_last_modified(*models)
+        conditional_response = get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_modified
+        )
+        if conditional_response is not None:
+            raise ConditionalResponse(conditional_response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (200, 304):
+            response['ETag'] = etag
+            if self.last_modified:
+                response['Last-Modified'] = http_date(self.last_modified)
+        return response
+
+
+class CachedListMixin:
+    """
+    Кэширует ответы list.
+    Кэш сбрасывается при изменении любой модели из cache_models.
+    Ответы, прочитанные с отстающей реплики, не кэшируются.
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        key = response_cache_key(request, self.cache_models)
+        data = get_cached_response(key)
+        if data is not None:
+            return response.Response(data)
+        list_response = super().list(request, *args, **kwargs)
+        if (
+            list_response.status_code == 200
+            and not replica_may_lag(*self.cache_models)
+        ):
+            set_cached_response(key, list_response.data)
+        return list_response
+
+
+class SparseQuerysetMixin:
+    """
+    Загружает из базы только колонки полей из параметра fields.
+    sparse_columns — колонки модели для каждого поля ответа,
+    sparse_always — колонки, нужные всегда, например для пагинации.
+    """
+    sparse_columns = {}
+    sparse_always = ('id',)
+
+    def select_fields(self, queryset, select=(), prefetch=()):
+        """
+        Подгружает связи select и prefetch. Если задан параметр fields,
+        то только связи запрошенных полей и только нужные колонки.
+        """
+        fields, _ = requested_fields(self.request)
+        sparse = fields is not None and self.request.method in SAFE_METHODS
+        if sparse:
+            select = [name for name in select if name in fields]
+            prefetch = [name for name in prefetch if name in fields]
+        # select_related() без аргументов подгрузил бы все связи.
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if not sparse:
+            return queryset
+        columns = list(self.sparse_always)
+        for name in fields:
+            columns += self.sparse_columns.get(name, ())
+        return queryset.only(*columns)
 
 
 class CreateListDestroyViewSet(
+    ConditionalGetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
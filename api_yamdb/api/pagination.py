@@ -0,0 +1,39 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Курсорная пагинация по дате публикации."""
+
+    ordering = ('-pub_date', 'id')
+
+
+class PageOrCursorPagination(PageNumberPagination):
+    """
+    Постраничная пагинация по умолчанию.
+    С параметром pagination=cursor или переданным cursor
+    используется курсорная пагинация без OFFSET и COUNT(*).
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def __init__(self):
+        self.cursor_paginator = PubDateCursorPagination()
+        self.use_cursor = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+            or self.cursor_paginator.cursor_query_param
+            in request.query_params
+        )
+        if self.use_cursor:
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.use_cursor:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
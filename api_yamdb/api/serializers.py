@@ -1,14 +1,75 @@
 from datetime import datetime
 
-from django.shortcuts import get_object_or_404
+from django.db import models
+from django.utils.encoding import smart_str
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.validators import UniqueValidator
 
 from reviews.models import (Category, Comment, Genre,
-                            Review, Title, User,
+                            LeaderboardEntry, Review, Title, User,
                             username_me)
+from reviews.taxonomy import taxonomy
 from reviews.validators import UsernameRegexValidator
 
+from .metrics import TimedSerializerMixin
+
+
+def requested_fields(request):
+    """
+    Поля из параметра fields и связи из параметра expand.
+    Без параметра fields вместо множества полей возвращает None.
+    """
+    params = request.query_params
+    expand = {name for name in params.get('expand', '').split(',') if name}
+    if not params.get('fields'):
+        return None, expand
+    return {name for name in params['fields'].split(',') if name}, expand
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Оставляет в ответе только поля из параметра fields.
+    Связи из expandable_fields выводятся слагами,
+    если их нет в параметре expand.
+    Действует только на запросы чтения: при записи поля нужны
+    для проверки данных.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        fields, expand = requested_fields(request)
+        unknown = expand - set(self.expandable_fields)
+        if unknown:
+            raise serializers.ValidationError({
+                'expand': [f'Неизвестные связи: {", ".join(sorted(unknown))}']
+            })
+        if fields is None:
+            return
+        unknown = fields - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': [f'Неизвестные поля: {", ".join(sorted(unknown))}']
+            })
+        for name in set(self.fields) - fields:
+            self.fields.pop(name)
+        for name, slug_field in self.expandable_fields.items():
+            if name not in self.fields or name in expand:
+                continue
+            if isinstance(self.fields[name], TaxonomyField):
+                self.fields[name] = type(self.fields[name])(slug_only=True)
+            else:
+                self.fields[name] = serializers.SlugRelatedField(
+                    slug_field=slug_field, read_only=True,
+                    many=isinstance(
+                        self.fields[name], serializers.ListSerializer
+                    ),
+                )
+
 
 class SingUpSerializer(serializers.Serializer):
     """Сериализатор для регистрации."""
@@ -39,7 +100,7 @@ class GetTokenSerializer(serializers.Serializer):
         return username_me(value)
 
 
-class UsersSerializer(serializers.ModelSerializer):
+class UsersSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для новых юзеров."""
 
     username = serializers.CharField(
@@ -65,7 +126,7 @@ class PersSerializer(UsersSerializer):
         read_only_fields = ('role',)
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для категорий (типов) произведений."""
 
     class Meta:
@@ -74,7 +135,7 @@ class CategorySerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для жанров."""
 
     class Meta:
@@ -83,14 +144,146 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
+class TaxonomyField(serializers.Field):
+    """
+    Категория или жанры произведения из кэша reviews.taxonomy.
+    С slug_only=True выводятся только слаги.
+    Снимок кэша берется один раз на сериализатор: версия не проверяется
+    для каждого произведения ответа.
+    """
+    model = None
+    serializer_class = None
+
+    def __init__(self, slug_only=False, **kwargs):
+        self.slug_only = slug_only
+        self.represented = {}
+        self.snapshot = None
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_taxonomy(self):
+        if self.snapshot is None:
+            self.snapshot = taxonomy(self.model)
+        return self.snapshot
+
+    def represent(self, item):
+        if self.slug_only:
+            return item.slug
+        # Представление одного объекта общее для всех произведений ответа.
+        if item.pk not in self.represented:
+            self.represented[item.pk] = self.serializer_class(item).data
+        return self.represented[item.pk]
+
+
+class CategoryField(TaxonomyField):
+    model = Category
+    serializer_class = CategorySerializer
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'category_id')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        item = self.get_taxonomy().by_id.get(value)
+        return None if item is None else self.represent(item)
+
+
+class GenreField(TaxonomyField):
+    """
+    Жанры берутся из genre_ids, заполненных TitleListSerializer,
+    из подгруженных жанров или одним запросом к связям произведения.
+    """
+    model = Genre
+    serializer_class = GenreSerializer
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', '*')
+        super().__init__(**kwargs)
+
+    def to_representation(self, title):
+        ids = getattr(title, 'genre_ids', None)
+        if ids is None:
+            prefetched = getattr(title, '_prefetched_objects_cache', {})
+            if 'genre' in prefetched:
+                ids = [genre.pk for genre in prefetched['genre']]
+            else:
+                ids = Title.genre.through.objects.filter(
+                    title_id=title.pk
+                ).values_list('genre_id', flat=True)
+        return [
+            self.represent(item) for item in self.get_taxonomy().sorted(ids)
+        ]
+
+
+def load_genre_ids(titles):
+    """Заполняет genre_ids произведений одним запросом к связям."""
+    genre_ids = {title.pk: [] for title in titles}
+    if not genre_ids:
+        return
+    for title_id, genre_id in Title.genre.through.objects.filter(
+        title_id__in=genre_ids
+    ).values_list('title_id', 'genre_id'):
+        genre_ids[title_id].append(genre_id)
+    for title in titles:
+        title.genre_ids = genre_ids[title.pk]
+
+
+class TitleListSerializer(serializers.ListSerializer):
+    """
+    Загружает id жанров всех произведений списка одним запросом,
+    если они не заполнены заранее.
+    """
+
+    def to_representation(self, data):
+        titles = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        if 'genre' in self.child.fields:
+            load_genre_ids([
+                title for title in titles
+                if getattr(title, 'genre_ids', None) is None
+            ])
+        return super().to_representation(titles)
+
+
+class TaxonomySlugRelatedField(serializers.SlugRelatedField):
+    """Поиск категории или жанра по слагу в кэше, без запроса к базе."""
+
+    def __init__(self, model, **kwargs):
+        self.model = model
+        self.snapshot = None
+        kwargs.setdefault('slug_field', 'slug')
+        kwargs.setdefault('queryset', model.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        if self.snapshot is None:
+            self.snapshot = taxonomy(self.model)
+        item = self.snapshot.by_slug.get(data)
+        if item is None:
+            self.fail(
+                'does_not_exist', slug_name=self.slug_field,
+                value=smart_str(data),
+            )
+        return item
+
+
+class TitleReadSerializer(
+    SparseFieldsSerializerMixin, TimedSerializerMixin,
+    serializers.ModelSerializer
+):
     """Сериализатор для возврата списка произведений."""
 
+    expandable_fields = {'category': 'slug', 'genre': 'slug'}
+
     rating = serializers.IntegerField(read_only=True)
-    category = CategorySerializer(read_only=True)
-    genre = GenreSerializer(many=True, read_only=True)
+    category = CategoryField()
+    genre = GenreField()
 
     class Meta:
+        list_serializer_class = TitleListSerializer
         model = Title
         fields = (
             'id', 'name', 'year',
@@ -102,19 +295,12 @@ class TitleReadSerializer(serializers.ModelSerializer):
             'genre', 'category')
 
 
-class TitleWriteSerializer(serializers.ModelSerializer):
+class TitleWriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для добавления произведений."""
 
-    genre = serializers.SlugRelatedField(
-        slug_field='slug',
-        many=True,
-        queryset=Genre.objects.all(),
-    )
-    category = serializers.SlugRelatedField(
-        slug_field='slug',
-        queryset=Category.objects.all(),
-    )
-    rating = serializers.IntegerField(required=False)
+    genre = TaxonomySlugRelatedField(Genre, many=True)
+    category = TaxonomySlugRelatedField(Category)
+    rating = serializers.IntegerField(read_only=True)
     year = serializers.IntegerField(required=False)
 
     class Meta:
@@ -134,7 +320,25 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         return data
 
 
-class ReviewCreateSerializer(serializers.ModelSerializer):
+class TitleBulkSerializer(TitleWriteSerializer):
+    """
+    Элемент пакетной загрузки произведений.
+    Слаги проверяются всем пакетом сразу в save_titles.
+    """
+
+    id = serializers.IntegerField(required=False)
+    year = serializers.IntegerField()
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField()
+
+    class Meta(TitleWriteSerializer.Meta):
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
+
+
+class ReviewCreateSerializer(
+    SparseFieldsSerializerMixin, TimedSerializerMixin,
+    serializers.ModelSerializer
+):
     """Сериализатор для создания отзывов."""
 
     author = serializers.SlugRelatedField(
@@ -146,21 +350,11 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'score', 'pub_date')
         read_only = ('id',)
 
-    def validate(self, data):
-        request = self.context.get('request')
 
-        if request.method == 'POST':
-            title_id = self.context['view'].kwargs.get('title_id')
-            title = get_object_or_404(Title, pk=title_id)
-            if Review.objects.filter(
-                    author=request.user, title=title
-            ).exists():
-                raise serializers.ValidationError(
-                    'Вы уже оставили отзыв!')
-        return data
-
-
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(
+    SparseFieldsSerializerMixin, TimedSerializerMixin,
+    serializers.ModelSerializer
+):
     """Сериализатор для работы с комментариями."""
 
     author = serializers.SlugRelatedField(
@@ -171,3 +365,75 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date')
         read_only = ('review',)
+
+
+class BundleReviewSerializer(ReviewCreateSerializer):
+    """Отзыв с последними комментариями для titles/{id}/bundle/."""
+
+    comments = CommentSerializer(
+        many=True, read_only=True, source='latest_comments'
+    )
+
+    class Meta(ReviewCreateSerializer.Meta):
+        fields = ReviewCreateSerializer.Meta.fields + ('comments',)
+
+
+class ScoreStatsSerializer(serializers.BaseSerializer):
+    """
+    Статистика оценок произведения по гистограмме ScoreCount:
+    распределение оценок 1–10, количество, среднее и медиана.
+    """
+
+    @staticmethod
+    def score_at(distribution, place):
+        """Оценка на месте place в отсортированном списке всех оценок."""
+        seen = 0
+        for score, count in distribution.items():
+            seen += count
+            if place < seen:
+                return score
+
+    def to_representation(self, counts):
+        distribution = {score: 0 for score in range(1, 11)}
+        for item in counts:
+            distribution[item.score] = item.count
+        total = sum(distribution.values())
+        mean = median = None
+        if total:
+            mean = round(sum(
+                score * count for score, count in distribution.items()
+            ) / total, 2)
+            median = (
+                self.score_at(distribution, (total - 1) // 2)
+                + self.score_at(distribution, total // 2)
+            ) / 2
+        return {
+            'count': total,
+            'mean': mean,
+            'median': median,
+            'distribution': {
+                str(score): count for score, count in distribution.items()
+            },
+        }
+
+
+class LeaderboardListSerializer(serializers.ListSerializer):
+    """Загружает жанры всех произведений рейтинга одним запросом."""
+
+    def to_representation(self, data):
+        entries = list(data)
+        load_genre_ids([entry.title for entry in entries])
+        return super().to_representation(entries)
+
+
+class LeaderboardEntrySerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
+    """Место произведения в рейтинге."""
+
+    title = TitleReadSerializer(read_only=True)
+
+    class Meta:
+        list_serializer_class = LeaderboardListSerializer
+        model = LeaderboardEntry
+        fields = ('position', 'value', 'title')
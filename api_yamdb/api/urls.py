@@ -2,7 +2,8 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    ReviewViewSet, SignUp, TitleViewSet, UsersViewSet,
+                    LeaderboardViewSet, ReviewViewSet, SignUp, TitleViewSet,
+                    UsersViewSet, export_catalog, get_cache_stats,
                     get_token)
 
 router_v1 = routers.DefaultRouter()
@@ -13,6 +14,9 @@ router_v1.register(
 )
 router_v1.register(r'genres', GenreViewSet, basename='genres')
 router_v1.register(r'titles', TitleViewSet, basename='titles')
+router_v1.register(
+    r'leaderboards', LeaderboardViewSet, basename='leaderboards'
+)
 router_v1.register(
     r'titles/(?P<title_id>\d+)/reviews',
     ReviewViewSet, basename='reviews'
@@ -29,5 +33,7 @@ jwt_patterns = [
 
 urlpatterns = [
     path('v1/auth/', include(jwt_patterns)),
+    path('v1/cache/stats/', get_cache_stats, name='cache_stats'),
+    path('v1/export/', export_catalog, name='export'),
     path('v1/', include(router_v1.urls)),
 ]
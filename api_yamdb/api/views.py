@@ -1,23 +1,36 @@
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import (filters, permissions, response, status, views,
-                            viewsets)
-from rest_framework.decorators import action, api_view
+from rest_framework import (filters, mixins, permissions, response, status,
+                            views, viewsets)
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import Category, Genre, Review, Title, User
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+from reviews.models import (Category, Comment, Genre, ImportCheckpoint,
+                            LeaderboardEntry, Review, Title, User)
+from reviews.outbox import enqueue_mail
+from reviews.taxonomy import categories, genres
 
-from .filters import FilterForTitle
-from .mixins import CreateListDestroyViewSet
+from .authentication import token_for_user
+from .bulk import BulkError, save_titles
+from .cache import cache_stats
+from .export import export_lines
+from .filters import FilterForTitle, TitleOrderingFilter
+from .mixins import (CachedListMixin, ConditionalGetMixin,
+                     CreateListDestroyViewSet, SparseQuerysetMixin)
+from .pagination import PageOrCursorPagination
 from .permissions import (IsAdmin, IsAdminOrReadOnly,
                           IsAuthorOrModeratorOrAdminOrReadOnly)
-from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, GetTokenSerializer, PersSerializer,
-                          ReviewCreateSerializer, SingUpSerializer,
+from .serializers import (BundleReviewSerializer, CategorySerializer,
+                          CommentSerializer, GenreSerializer,
+                          GetTokenSerializer, LeaderboardEntrySerializer,
+                          PersSerializer, ReviewCreateSerializer,
+                          ScoreStatsSerializer, SingUpSerializer,
                           TitleReadSerializer, TitleWriteSerializer,
                           UsersSerializer)
 
@@ -43,7 +56,7 @@ class SignUp(views.APIView):
                 status.HTTP_400_BAD_REQUEST
             )
         code = default_token_generator.make_token(user)
-        send_mail(
+        enqueue_mail(
             'Код токена',
             f'Код для получения токена {code}',
             settings.DEFAULT_FROM_EMAIL,
@@ -65,7 +78,7 @@ def get_token(request):
         'confirmation_code'
     )
     if default_token_generator.check_token(user, confirmation_code):
-        token = AccessToken.for_user(user)
+        token = token_for_user(user)
         return response.Response(
             {'token': str(token)}, status=status.HTTP_200_OK
         )
@@ -75,7 +88,25 @@ def get_token(request):
     )
 
 
-class UsersViewSet(viewsets.ModelViewSet):
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def get_cache_stats(request):
+    """Функция получения счетчиков попаданий в кэш ответов."""
+    return response.Response(cache_stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def export_catalog(request):
+    """Функция потоковой выгрузки каталога в формате jsonl."""
+    export = StreamingHttpResponse(
+        export_lines(), content_type='application/x-ndjson'
+    )
+    export['Content-Disposition'] = 'attachment; filename="catalog.jsonl"'
+    return export
+
+
+class UsersViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UsersSerializer
     permission_classes = (IsAdmin,)
@@ -83,6 +114,7 @@ class UsersViewSet(viewsets.ModelViewSet):
     search_fields = ('username', )
     filter_backends = (DjangoFilterBackend, filters.SearchFilter)
     lookup_field = 'username'
+    conditional_models = (User,)
 
     @action(
         methods=['GET', 'PATCH'],
@@ -90,7 +122,7 @@ class UsersViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated]
     )
     def me(self, request):
-        user = request.user
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'PATCH':
             serializer = PersSerializer(
                 user, data=request.data, partial=True
@@ -106,81 +138,324 @@ class UsersViewSet(viewsets.ModelViewSet):
         )
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(CachedListMixin, CreateListDestroyViewSet):
     """Вьюсет для категорий."""
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_models = conditional_models = (Category,)
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(CachedListMixin, CreateListDestroyViewSet):
     """Отображение действий с жанрами для произведений."""
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_models = conditional_models = (Genre,)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(CachedListMixin, ConditionalGetMixin, SparseQuerysetMixin,
+                   viewsets.ModelViewSet):
     """
     Вьюсет для произведений.
     Для запросов на чтение используется TitleReadSerializer
     Для запросов на изменение используется TitleWriteSerializer
     """
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    )
+    queryset = Title.objects.all()
+    cache_models = conditional_models = (Title, Category, Genre, Review)
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, )
+    filter_backends = (DjangoFilterBackend, TitleOrderingFilter, )
     filterset_class = FilterForTitle
-    ordering_fields = ('name',)
+    ordering_fields = ('name', 'rating', 'year', 'rating_count')
+    sparse_columns = {
+        'name': ('name',),
+        'year': ('year',),
+        'rating': ('rating',),
+        'description': ('description',),
+        'category': ('category',),
+    }
 
-    def get_serializer_class(self):
+    def get_queryset(self):
+        queryset = super().get_queryset()
         if self.action in ('list', 'retrieve'):
+            # Категории и жанры TitleReadSerializer берет из кэша
+            # reviews.taxonomy, соединения с их таблицами не нужны.
+            return self.select_fields(queryset)
+        return queryset
+
+    def get_conditional_models(self):
+        if self.action == 'bundle':
+            return self.conditional_models + (Comment, User)
+        if self.action == 'stats':
+            return (Title, (Review, self.kwargs.get('pk')))
+        return self.conditional_models
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve', 'bundle'):
             return TitleReadSerializer
         return TitleWriteSerializer
 
+    @action(methods=['GET'], detail=True)
+    def bundle(self, request, pk=None):
+        """
+        Страница произведения за один запрос: произведение, рейтинг,
+        первая страница отзывов с авторами и последние комментарии
+        к каждому отзыву. Количество SQL-запросов не зависит от числа
+        отзывов и комментариев.
+        """
+        title = self.get_object()
+        page_size = api_settings.PAGE_SIZE
+        reviews = list(
+            title.reviews.select_related('author').order_by('-pub_date', 'id')
+            [:page_size]
+        )
+        # Последние комментарии каждого отзыва одним запросом:
+        # коррелированный подзапрос с LIMIT для каждого отзыва.
+        latest = Comment.objects.filter(
+            review_id=OuterRef('review_id')
+        ).order_by('-pub_date', 'id').values('id')[
+            :settings.BUNDLE_COMMENTS
+        ]
+        comments = {review.pk: [] for review in reviews}
+        for comment in Comment.objects.filter(
+            review_id__in=comments, id__in=Subquery(latest)
+        ).select_related('author').order_by('-pub_date', 'id'):
+            comments[comment.review_id].append(comment)
+        for review in reviews:
+            review.latest_comments = comments[review.pk]
+        # Количество отзывов и рейтинг хранятся в произведении.
+        next_page = None
+        if title.rating_count > page_size:
+            next_page = reverse(
+                'reviews-list', args=[title.pk], request=request
+            ) + '?page=2'
+        return response.Response({
+            'title': self.get_serializer(title).data,
+            'rating': title.rating,
+            'reviews_count': title.rating_count,
+            'reviews': {
+                'next': next_page,
+                'results': BundleReviewSerializer(reviews, many=True).data,
+            },
+        })
 
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(methods=['GET'], detail=True)
+    def stats(self, request, pk=None):
+        """
+        Распределение, количество, среднее и медиана оценок.
+        Читается гистограмма из не больше чем десяти строк,
+        время ответа не зависит от количества отзывов.
+        """
+        title = self.get_object()
+        return response.Response(
+            ScoreStatsSerializer(title.score_counts.all()).data
+        )
+
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='bulk',
+        permission_classes=[IsAdmin]
+    )
+    def bulk(self, request):
+        """
+        Пакетное создание и изменение произведений.
+        Элементы с id обновляются, без id — создаются.
+        При ошибке хотя бы в одном элементе ничего не записывается.
+        Ответ — произведения в формате TitleReadSerializer, 201,
+        если хоть одно создано, иначе 200.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError('Ожидается непустой список произведений')
+        if len(items) > settings.TITLES_BULK_MAX:
+            raise ValidationError(
+                f'Не больше {settings.TITLES_BULK_MAX} произведений за запрос'
+            )
+        try:
+            titles, created = save_titles(items)
+        except BulkError as error:
+            return response.Response(
+                {'errors': error.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return response.Response(
+            TitleReadSerializer(titles, many=True).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class LeaderboardViewSet(CachedListMixin, ConditionalGetMixin,
+                         mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Рейтинги произведений из таблицы, которую пересобирает
+    команда refreshleaderboards.
+    Параметры: board (top_rated, most_reviewed, trending),
+    category или genre — слаг области, limit — количество мест.
+    """
+    serializer_class = LeaderboardEntrySerializer
+    pagination_class = None
+    filter_backends = ()
+    cache_models = conditional_models = (
+        LeaderboardEntry, Title, Category, Genre, Review
+    )
+
+    def get_scope(self, params):
+        if 'category' in params and 'genre' in params:
+            raise ValidationError('Укажите либо category, либо genre')
+        for scope, snapshot in (
+            (LeaderboardEntry.CATEGORY, categories()),
+            (LeaderboardEntry.GENRE, genres()),
+        ):
+            if scope in params:
+                item = snapshot.by_slug.get(params[scope])
+                if item is None:
+                    raise NotFound(f'{scope} {params[scope]} не найден')
+                return scope, item.pk
+        return LeaderboardEntry.GLOBAL, 0
+
+    def get_limit(self, params):
+        limit = params.get('limit', settings.LEADERBOARD_SIZE)
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= settings.LEADERBOARD_SIZE:
+            raise ValidationError({'limit': [
+                f'Число от 1 до {settings.LEADERBOARD_SIZE}'
+            ]})
+        return limit
+
+    def get_queryset(self):
+        params = self.request.query_params
+        board = params.get('board', LeaderboardEntry.TOP_RATED)
+        if board not in dict(LeaderboardEntry.BOARD_CHOICES):
+            raise ValidationError({'board': [
+                'Один из: ' + ', '.join(
+                    name for name, _ in LeaderboardEntry.BOARD_CHOICES
+                )
+            ]})
+        scope, scope_id = self.get_scope(params)
+        return LeaderboardEntry.objects.filter(
+            board=board, scope=scope, scope_id=scope_id
+        ).select_related('title')[:self.get_limit(params)]
+
+
+class ReviewViewSet(ConditionalGetMixin, SparseQuerysetMixin,
+                    viewsets.ModelViewSet):
     """Отображение действий с отзывами."""
 
     serializer_class = ReviewCreateSerializer
     permission_classes = (
         IsAuthorOrModeratorOrAdminOrReadOnly,
     )
+    pagination_class = PageOrCursorPagination
+    sparse_columns = {
+        'text': ('text',),
+        'author': ('author__username',),
+        'score': ('score',),
+    }
+    # pub_date нужна курсорной пагинации, title — менеджеру title.reviews.
+    sparse_always = ('id', 'pub_date', 'title')
 
     def get_title(self):
-        return get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id')
-        )
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title,
+                id=self.kwargs.get('title_id')
+            )
+        return self._title
+
+    def get_conditional_models(self):
+        # Отзывы произведения и само произведение: изменения других
+        # произведений и пользователей на ответ не влияют.
+        # ImportCheckpoint меняется при загрузке csv без сигналов.
+        title_id = self.kwargs.get('title_id')
+        return ((Review, title_id), (Title, title_id), ImportCheckpoint)
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.select_fields(
+            self.get_title().reviews.all(), select=('author',)
+        )
 
     def perform_create(self, serializer):
-        serializer.save(
-            author=self.request.user, title=self.get_title()
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author_id=self.request.user.pk, title=self.get_title()
+                )
+        except IntegrityError:
+            # Повтор отзыва отличается от других нарушений, например
+            # удаленного во время запроса произведения, по наличию отзыва.
+            if not Review.objects.filter(
+                title_id=self.get_title().pk, author_id=self.request.user.pk
+            ).exists():
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    settings.MESSAGE_REVIEW_EXISTS
+                ]
+            })
+
+    def locked_review(self, review):
+        """
+        Перечитывает отзыв с блокировкой строки до конца транзакции.
+        Сигналы сдвигают рейтинг от загруженной оценки, поэтому она
+        должна быть актуальной, а не прочитанной до параллельного
+        изменения того же отзыва.
+        """
+        return get_object_or_404(
+            Review.objects.select_for_update(), pk=review.pk
         )
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.instance = self.locked_review(serializer.instance)
+            serializer.save()
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self.locked_review(instance).delete()
+
+
+class CommentViewSet(ConditionalGetMixin, SparseQuerysetMixin,
+                     viewsets.ModelViewSet):
     """Отображение действий с комментариями."""
 
     serializer_class = CommentSerializer
     permission_classes = (
         IsAuthorOrModeratorOrAdminOrReadOnly,
     )
+    pagination_class = PageOrCursorPagination
+    sparse_columns = {
+        'text': ('text',),
+        'author': ('author__username',),
+    }
+    sparse_always = ('id', 'pub_date', 'review')
 
     def get_review(self):
-        return get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id'),
+            )
+        return self._review
+
+    def get_conditional_models(self):
+        # Версия отзывов произведения меняется и при изменении,
+        # переносе или удалении самого отзыва.
+        return (
+            (Comment, self.kwargs.get('review_id')),
+            (Review, self.kwargs.get('title_id')),
+            ImportCheckpoint,
         )
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.select_fields(
+            self.get_review().comments.all(), select=('author',)
+        )
 
     def perform_create(self, serializer):
         serializer.save(
-            author=self.request.user, review=self.get_review()
+            author_id=self.request.user.pk, review=self.get_review()
         )
@@ -0,0 +1,115 @@
+"""
+PostgreSQL с пулом соединений внутри процесса.
+Закрытое Django соединение возвращается в пул, а не разрывается,
+поэтому CONN_MAX_AGE всегда 0: соединение возвращается в пул в конце
+запроса, и gthread-воркеры по очереди используют несколько соединений.
+Когда все соединения заняты, поток ждет освободившееся.
+"""
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 10
+POOL_TIMEOUT = 30
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    """
+    Пул, в котором getconn ждет свободное соединение до timeout секунд,
+    а не сразу выбрасывает PoolError.
+    """
+
+    def __init__(self, min_size, max_size, timeout, *args, **kwargs):
+        self.free_slots = threading.BoundedSemaphore(max_size)
+        self.timeout = timeout
+        super().__init__(min_size, max_size, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self.free_slots.acquire(timeout=self.timeout):
+            raise pool.PoolError(
+                f'За {self.timeout} с не освободилось ни одно соединение'
+            )
+        try:
+            return super().getconn(key)
+        except Exception:
+            self.free_slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self.free_slots.release()
+
+
+def connection_pool(conn_params, min_size, max_size, timeout):
+    """
+    Пул соединений, общий для всех потоков процесса.
+    Пулы различаются параметрами подключения: служебное соединение
+    Django к базе postgres не должно получить соединение с основной базой.
+    """
+    key = tuple(sorted(
+        (name, str(value)) for name, value in conn_params.items()
+    ))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = BlockingConnectionPool(
+                min_size, max_size, timeout, **conn_params
+            )
+        return _pools[key]
+
+
+def close_pools():
+    with _pools_lock:
+        for connections in _pools.values():
+            connections.closeall()
+        _pools.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Дополнительные ключи OPTIONS:
+    pool_min_size и pool_max_size — границы размера пула,
+    pool_timeout — сколько секунд ждать свободное соединение.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Постоянное соединение занимало бы место в пуле между запросами.
+        self.settings_dict['CONN_MAX_AGE'] = 0
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pool_min_size = params.pop('pool_min_size', POOL_MIN_SIZE)
+        self.pool_max_size = params.pop('pool_max_size', POOL_MAX_SIZE)
+        self.pool_timeout = params.pop('pool_timeout', POOL_TIMEOUT)
+        return params
+
+    def get_new_connection(self, conn_params):
+        self.pool = connection_pool(
+            conn_params, self.pool_min_size, self.pool_max_size,
+            self.pool_timeout,
+        )
+        connection = self.pool.getconn()
+        # Соединение из пула могло остаться в режиме autocommit,
+        # в нем нельзя узнать уровень изоляции по умолчанию.
+        connection.autocommit = False
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
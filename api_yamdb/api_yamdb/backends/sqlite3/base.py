@@ -0,0 +1,44 @@
+"""
+SQLite с настройками для параллельной записи.
+PRAGMA выполняются при каждом подключении, транзакции открываются
+через BEGIN IMMEDIATE: блокировка на запись берется в начале
+транзакции, и при занятой базе срабатывает ожидание busy_timeout,
+а не ошибка database is locked при повышении блокировки.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'foreign_keys': 'ON',
+}
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Дополнительные ключи OPTIONS:
+    pragmas — словарь PRAGMA поверх значений по умолчанию,
+    transaction_mode — DEFERRED, IMMEDIATE (по умолчанию) или EXCLUSIVE.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        self.transaction_mode = params.pop('transaction_mode', 'IMMEDIATE')
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ValueError(
+                f'Неизвестный режим транзакций {self.transaction_mode}'
+            )
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
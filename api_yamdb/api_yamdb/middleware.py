@@ -0,0 +1,50 @@
+import hashlib
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import use_replicas
+
+PIN_COOKIE = 'primary_db'
+PIN_KEY = 'primary-db:{}'
+
+
+def pin_key(request):
+    """Ключ закрепления за основной базой по токену из Authorization."""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not header.startswith('Bearer '):
+        return None
+    return PIN_KEY.format(hashlib.md5(header.encode()).hexdigest())
+
+
+class ReplicaPinMiddleware:
+    """
+    Закрепляет пользователя за основной базой после изменения данных.
+    Окно REPLICA_LAG секунд хранится в cookie, а для клиентов
+    с JWT — в кэше по хэшу токена.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        writes = request.method not in SAFE_METHODS
+        key = pin_key(request)
+        pinned = (
+            writes
+            or PIN_COOKIE in request.COOKIES
+            or (key is not None and cache.get(key))
+        )
+        with nullcontext() if pinned else use_replicas():
+            response = self.get_response(request)
+        if writes and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_LAG, httponly=True
+            )
+            if key is not None:
+                cache.set(key, True, settings.REPLICA_LAG)
+        return response
@@ -0,0 +1,69 @@
+"""
+Чтение с реплик, запись в основную базу.
+С реплик читают только запросы, которым это разрешила
+ReplicaPinMiddleware: безопасные запросы пользователей, не изменявших
+данные последние REPLICA_LAG секунд. Команды, изменяющие запросы
+и пользователи сразу после изменения читают основную базу.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from reviews.versions import get_last_change
+
+_state = threading.local()
+
+
+@contextmanager
+def use_replicas():
+    """Разрешает текущему потоку читать с реплик."""
+    previous = getattr(_state, 'replicas', False)
+    _state.replicas = True
+    try:
+        yield
+    finally:
+        _state.replicas = previous
+
+
+def reads_from_replica():
+    return bool(settings.DATABASE_REPLICAS) and getattr(
+        _state, 'replicas', False
+    )
+
+
+def replica_may_lag(*models):
+    """
+    Реплика могла еще не получить последние изменения моделей.
+    Такие ответы нельзя кэшировать под новой версией моделей.
+    """
+    if not reads_from_replica():
+        return False
+    last_change = get_last_change(*models)
+    return (
+        last_change is not None
+        and time.time() - last_change < settings.REPLICA_LAG
+    )
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (
+            not reads_from_replica()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -24,7 +24,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api_yamdb.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,13 +56,94 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# DB_ENGINE: api_yamdb.backends.sqlite3 (WAL и ожидание блокировок),
+# django.db.backends.postgresql или api_yamdb.backends.postgresql_pool
+# (пул соединений в процессе, размер задают DB_POOL_MIN/DB_POOL_MAX,
+# DB_POOL_TIMEOUT — сколько секунд ждать свободное соединение).
+DB_ENGINE = os.getenv('DB_ENGINE', 'api_yamdb.backends.sqlite3')
+
+DB_OPTIONS = {}
+if DB_ENGINE == 'api_yamdb.backends.sqlite3':
+    DB_OPTIONS = {
+        'pragmas': {
+            'busy_timeout': int(os.getenv('DB_BUSY_TIMEOUT', 5000)),
+            'mmap_size': int(os.getenv('DB_MMAP_SIZE', 256 * 1024 * 1024)),
+        },
+    }
+elif DB_ENGINE == 'api_yamdb.backends.postgresql_pool':
+    DB_OPTIONS = {
+        'pool_min_size': int(os.getenv('DB_POOL_MIN', 1)),
+        'pool_max_size': int(os.getenv('DB_POOL_MAX', 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    }
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.getenv('POSTGRES_USER', ''),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        # Соединение переиспользуется между запросами указанное число
+        # секунд. С пулом соединений всегда 0: соединение возвращается
+        # в пул в конце запроса.
+        'CONN_MAX_AGE': (
+            0 if DB_ENGINE == 'api_yamdb.backends.postgresql_pool'
+            else int(os.getenv('DB_CONN_MAX_AGE', 60))
+        ),
+        'OPTIONS': DB_OPTIONS,
+    }
+}
+
+# Реплики для чтения, DB_REPLICAS — список через запятую:
+# для SQLite пути к файлам, для PostgreSQL хосты.
+# Локальные файлы-реплики обновляет команда syncreplicas.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if 'sqlite3' in DB_ENGINE else 'HOST': replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api_yamdb.routers.ReplicaRouter']
+
+# Допустимое отставание реплик, секунд: столько пользователь после
+# изменения данных читает основную базу.
+REPLICA_LAG = int(os.getenv('REPLICA_LAG', 10))
+
+# Кэш хранит версии моделей, отметки изменения прав и закрепления
+# за основной базой, поэтому при нескольких процессах он должен быть
+# общим: файловый, Redis или memcached. LocMemCache — только для
+# разработки в одном процессе, gunicorn.conf.py с ним больше одного
+# воркера не запускает.
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', LOCMEM_CACHE),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        },
     }
 }
 
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Запросы дольше порога пишутся в лог api.slow_requests со списком SQL,
+# 0 — не писать. /metrics доступен администраторам и по токену
+# METRICS_TOKEN, всем — только при METRICS_PUBLIC=True.
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 0))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.getenv('METRICS_PUBLIC', 'False') == 'True'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -95,7 +178,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -110,9 +193,36 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Права из claims токена без запроса к базе. Действует только с общим
+# кэшем (CACHE_BACKEND): с LocMemCache пользователь загружается из базы.
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'True') == 'True'
+JWT_ROLE_CHANGE_CHECK = os.getenv('JWT_ROLE_CHANGE_CHECK', 'True') == 'True'
+# Сколько секунд время изменения прав, прочитанное из базы, живет в кэше:
+# столько не заметно изменение прав в обход сигналов, например update().
+JWT_ROLE_CHANGE_TTL = int(os.getenv('JWT_ROLE_CHANGE_TTL', 60))
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 DEFAULT_FROM_EMAIL = 'black.yamdb@example.com'
+# outbox — письма отправляет команда sendoutbox, sync — сразу в запросе.
+EMAIL_DELIVERY = os.getenv('EMAIL_DELIVERY', 'outbox')
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF = 30
+# На сколько секунд sendoutbox берет письма в работу; должно быть
+# больше времени отправки пачки, иначе письмо уйдет дважды.
+OUTBOX_LEASE = int(os.getenv('OUTBOX_LEASE', 300))
+# Наибольшее число произведений в одном запросе titles/bulk/.
+TITLES_BULK_MAX = int(os.getenv('TITLES_BULK_MAX', 5000))
+# Сколько последних комментариев к отзыву отдает titles/{id}/bundle/.
+BUNDLE_COMMENTS = int(os.getenv('BUNDLE_COMMENTS', 3))
+# Рейтинги произведений (refreshleaderboards): длина каждого рейтинга,
+# вес байесовского среднего в отзывах, наименьшее число отзывов
+# для top_rated и окно trending в днях.
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', 100))
+LEADERBOARD_PRIOR_WEIGHT = int(os.getenv('LEADERBOARD_PRIOR_WEIGHT', 10))
+LEADERBOARD_MIN_REVIEWS = int(os.getenv('LEADERBOARD_MIN_REVIEWS', 3))
+LEADERBOARD_TRENDING_DAYS = int(os.getenv('LEADERBOARD_TRENDING_DAYS', 7))
 AUTH_USER_MODEL = 'reviews.User'
 
 LENG_SLUG = 50
@@ -123,3 +233,4 @@ LENG_CUT = 30
 
 MESSAGE_EMAIL_EXISTS = 'Этот email уже занят'
 MESSAGE_USERNAME_EXISTS = 'Это имя уже занят'
+MESSAGE_REVIEW_EXISTS = 'Вы уже оставили отзыв!'
@@ -2,7 +2,11 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
 
+from .views import health, metrics
+
 urlpatterns = [
+    path('health/', health, name='health'),
+    path('metrics', metrics, name='metrics'),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     path(
@@ -0,0 +1,50 @@
+import hmac
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import StatelessJWTAuthentication
+from api.metrics import prometheus_text
+
+
+def health(request):
+    """Проверка работоспособности для балансировщика и Docker."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Exception:
+        return JsonResponse({'status': 'database unavailable'}, status=503)
+    return JsonResponse({'status': 'ok'})
+
+
+def metrics_allowed(request):
+    """
+    Метрики открыты всем только при METRICS_PUBLIC=True.
+    Иначе нужен заголовок Authorization: Bearer <METRICS_TOKEN>
+    или администратор: по JWT или по сессии админки.
+    """
+    if settings.METRICS_PUBLIC:
+        return True
+    if settings.METRICS_TOKEN and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {settings.METRICS_TOKEN}',
+    ):
+        return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_admin:
+        return True
+    try:
+        authenticated = StatelessJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_admin
+
+
+def metrics(request):
+    """Метрики запросов в формате Prometheus."""
+    if not metrics_allowed(request):
+        return HttpResponse(status=401)
+    return HttpResponse(prometheus_text(), content_type=CONTENT_TYPE_LATEST)
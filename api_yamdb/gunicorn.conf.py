@@ -0,0 +1,111 @@
+"""
+Настройки gunicorn для запуска в продакшене:
+gunicorn -c gunicorn.conf.py api_yamdb.wsgi:application
+
+Все значения можно переопределить переменными окружения.
+Плавный перезапуск воркеров — сигнал HUP мастеру, при preload_app
+новый код подхватывается только полным перезапуском.
+Больше одного воркера запускается только с общим кэшем (CACHE_BACKEND):
+с LocMemCache у каждого воркера были бы свои версии моделей,
+отметки отзыва токенов и закрепления за основной базой.
+С PROMETHEUS_MULTIPROC_DIR воркеры пишут метрики в этот каталог,
+он очищается при запуске мастера.
+При EMAIL_DELIVERY=outbox мастер запускает рядом с воркерами
+manage.py sendoutbox --loop, иначе коды подтверждения не уйдут,
+и перезапускает его через OUTBOX_RESTART_DELAY секунд, если он упал.
+OUTBOX_WORKER=False отключает его, если sendoutbox работает отдельно.
+"""
+import glob
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.getenv('GUNICORN_THREADS', 2))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+cache_backend = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+if workers > 1 and cache_backend.endswith('.LocMemCache'):
+    raise RuntimeError(
+        f'{workers} воркеров с LocMemCache: кэш не будет общим.'
+        ' Укажите общий кэш в CACHE_BACKEND и CACHE_LOCATION'
+        ' или GUNICORN_WORKERS=1.'
+    )
+preload_app = True
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+
+metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if metrics_dir:
+    os.makedirs(metrics_dir, exist_ok=True)
+
+outbox_worker = (
+    os.getenv('EMAIL_DELIVERY', 'outbox') == 'outbox'
+    and os.getenv('OUTBOX_WORKER', 'True') == 'True'
+)
+outbox_restart_delay = float(os.getenv('OUTBOX_RESTART_DELAY', 5))
+outbox_process = None
+outbox_stopping = threading.Event()
+
+
+def on_starting(server):
+    """Удаляет метрики воркеров прошлого запуска."""
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    """Метрики завершившегося воркера больше не обновляются."""
+    if metrics_dir:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def supervise_outbox(server):
+    """Запускает sendoutbox и перезапускает его, пока работает мастер."""
+    global outbox_process
+    while not outbox_stopping.is_set():
+        outbox_process = subprocess.Popen(
+            [sys.executable, 'manage.py', 'sendoutbox', '--loop'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        server.log.info('sendoutbox запущен: pid %s', outbox_process.pid)
+        # Код может быть 0, если процесс уже подобрал мастер gunicorn.
+        code = outbox_process.wait()
+        if outbox_stopping.is_set():
+            break
+        server.log.error(
+            'sendoutbox завершился (код %s), перезапуск через %s с',
+            code, outbox_restart_delay,
+        )
+        outbox_stopping.wait(outbox_restart_delay)
+
+
+def when_ready(server):
+    """Запускает отправку писем из очереди."""
+    if outbox_worker:
+        threading.Thread(
+            target=supervise_outbox, args=(server,), name='sendoutbox',
+            daemon=True,
+        ).start()
+
+
+def on_exit(server):
+    """Останавливает отправку писем вместе с мастером."""
+    outbox_stopping.set()
+    if outbox_process is not None and outbox_process.poll() is None:
+        outbox_process.terminate()
+        outbox_process.wait(graceful_timeout)
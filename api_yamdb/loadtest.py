@@ -0,0 +1,153 @@
+"""
+Нагрузочный тест списка произведений под gunicorn.
+
+Для каждого количества воркеров запускает gunicorn с gunicorn.conf.py,
+нагружает /api/v1/titles/ параллельными клиентами и печатает
+пропускную способность и задержки:
+
+    python loadtest.py --workers 1 2 4 --clients 16 --duration 10
+
+Кэш ответов по умолчанию отключается (DummyCache), чтобы измерялась
+работа воркеров, а не чтение из кэша. С --cache используется общий
+файловый кэш во временной директории. База данных должна быть
+заполнена заранее: python manage.py migrate && python manage.py importcsv
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+URL = 'http://127.0.0.1:{port}/api/v1/titles/'
+HEALTH_URL = 'http://127.0.0.1:{port}/health/'
+
+
+def start_server(workers, threads, port, cache_dir):
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_ACCESSLOG='',
+    )
+    if cache_dir:
+        # Кэш должен быть общим для всех воркеров.
+        env['CACHE_BACKEND'] = (
+            'django.core.cache.backends.filebased.FileBasedCache'
+        )
+        env['CACHE_LOCATION'] = cache_dir
+    else:
+        env['CACHE_BACKEND'] = 'django.core.cache.backends.dummy.DummyCache'
+    server = subprocess.Popen(
+        ['gunicorn', '-c', 'gunicorn.conf.py', 'api_yamdb.wsgi:application'],
+        cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('gunicorn завершился при запуске')
+        try:
+            if requests.get(HEALTH_URL.format(port=port), timeout=1).ok:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError('gunicorn не ответил на /health/ за 30 секунд')
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def client(url, duration):
+    """Отправляет запросы до истечения времени, возвращает задержки в мс."""
+    session = requests.Session()
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            response = session.get(url, timeout=10)
+        except requests.RequestException:
+            errors += 1
+            continue
+        if response.status_code != 200:
+            errors += 1
+            continue
+        latencies.append((time.monotonic() - started) * 1000)
+    return latencies, errors
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run(workers, threads, clients, duration, port, cache_dir):
+    server = start_server(workers, threads, port, cache_dir)
+    url = URL.format(port=port)
+    try:
+        client(url, 1)
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.starmap(client, [(url, duration)] * clients)
+    finally:
+        stop_server(server)
+    latencies = [value for values, _ in results for value in values]
+    return {
+        'workers': workers,
+        'rps': len(latencies) / duration,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'errors': sum(errors for _, errors in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument(
+        '--cache', action='store_true',
+        help='Не отключать кэш ответов.',
+    )
+    options = parser.parse_args()
+    print(f'CPU: {multiprocessing.cpu_count()}')
+    print(f'{"воркеры":>8} {"запр/с":>9} {"p50, мс":>9} {"p95, мс":>9}'
+          f' {"ошибки":>7}')
+    baseline = None
+    for workers in options.workers:
+        cache_dir = tempfile.mkdtemp() if options.cache else None
+        result = run(
+            workers, options.threads, options.clients, options.duration,
+            options.port, cache_dir,
+        )
+        baseline = baseline or result['rps'] or None
+        scale = result['rps'] / baseline if baseline else 0
+        print(
+            f'{result["workers"]:>8} {result["rps"]:>9.1f}'
+            f' {result["p50"]:>9.1f} {result["p95"]:>9.1f}'
+            f' {result["errors"]:>7}  x{scale:.2f}'
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import (Category, Comment, Genre, OutgoingEmail, Review, Title,
+                     User)
 
 
 @admin.register(User)
@@ -66,7 +67,7 @@ class GenreTitleInline(admin.TabularInline):
 class TitleAdmin(admin.ModelAdmin):
     list_display = (
         'pk', 'name', 'year',
-        'description', 'category',
+        'description', 'category', 'rating',
     )
     search_fields = ('name',)
     list_filter = ('year', 'category', 'genre',)
@@ -74,3 +75,15 @@ class TitleAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     inlines = [GenreTitleInline]
     exclude = ('genre',)
+    readonly_fields = ('rating', 'rating_count',)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'subject', 'recipients', 'status',
+        'attempts', 'next_attempt_at', 'sent_at',
+    )
+    list_filter = ('status',)
+    search_fields = ('recipients',)
+    empty_value_display = '-пусто-'
@@ -0,0 +1,116 @@
+"""
+Материализованные рейтинги произведений.
+top_rated — байесовское среднее: оценки произведения смешиваются
+с prior_weight оценками, равными средней оценке по всем произведениям,
+поэтому единственная оценка 10 не выводит произведение на первое место.
+most_reviewed — количество отзывов, trending — отзывы в день
+за последние trending_days дней.
+Каждый рейтинг строится для всех произведений, для каждой категории
+и каждого жанра и хранится в LeaderboardEntry.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import LeaderboardEntry, Review, Title
+from .versions import bump_versions
+
+
+def push(heap, size, item):
+    """Оставляет в куче size наибольших элементов."""
+    if len(heap) < size:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def recent_counts(days):
+    """Количество отзывов каждого произведения за последние days дней."""
+    since = timezone.now() - timedelta(days=days)
+    return dict(Review.objects.filter(pub_date__gte=since).order_by().values(
+        'title'
+    ).annotate(recent=Count('id')).values_list('title', 'recent'))
+
+
+def refresh_leaderboards(
+    size=None, prior_weight=None, min_reviews=None, trending_days=None
+):
+    """
+    Пересобирает все рейтинги. Произведения читаются одним проходом,
+    в памяти держится не больше size мест на каждый рейтинг.
+    Возвращает количество записанных мест.
+    """
+    size = settings.LEADERBOARD_SIZE if size is None else size
+    prior_weight = (
+        settings.LEADERBOARD_PRIOR_WEIGHT if prior_weight is None
+        else prior_weight
+    )
+    min_reviews = (
+        settings.LEADERBOARD_MIN_REVIEWS if min_reviews is None
+        else min_reviews
+    )
+    trending_days = (
+        settings.LEADERBOARD_TRENDING_DAYS if trending_days is None
+        else trending_days
+    )
+    totals = Title.objects.aggregate(
+        rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count')
+    )
+    prior = (
+        totals['rating_sum'] / totals['rating_count']
+        if totals['rating_count'] else 0
+    )
+    genres = {}
+    for title_id, genre_id in Title.genre.through.objects.values_list(
+        'title_id', 'genre_id'
+    ).iterator():
+        genres.setdefault(title_id, []).append(genre_id)
+    recent = recent_counts(trending_days)
+    heaps = {}
+    for title_id, category_id, rating_sum, rating_count in (
+        Title.objects.order_by().values_list(
+            'id', 'category_id', 'rating_sum', 'rating_count'
+        ).iterator()
+    ):
+        rating = rating_sum / rating_count if rating_count else 0
+        values = []
+        if rating_count and rating_count >= min_reviews:
+            score = (
+                (rating_sum + prior_weight * prior)
+                / (rating_count + prior_weight)
+            )
+            values.append((LeaderboardEntry.TOP_RATED, score, rating_count))
+        if rating_count:
+            values.append((LeaderboardEntry.MOST_REVIEWED, rating_count,
+                           rating))
+        if title_id in recent:
+            values.append((LeaderboardEntry.TRENDING,
+                           recent[title_id] / trending_days, rating_count))
+        scopes = [(LeaderboardEntry.GLOBAL, 0),
+                  (LeaderboardEntry.CATEGORY, category_id)]
+        scopes += [(LeaderboardEntry.GENRE, genre_id)
+                   for genre_id in genres.get(title_id, ())]
+        for board, value, tiebreak in values:
+            # При равенстве выше произведение с меньшим id.
+            item = (value, tiebreak, -title_id)
+            for scope in scopes:
+                push(heaps.setdefault((board, *scope), []), size, item)
+    entries = [
+        LeaderboardEntry(
+            board=board, scope=scope, scope_id=scope_id,
+            position=position, title_id=-title_id, value=value,
+        )
+        for (board, scope, scope_id), heap in heaps.items()
+        for position, (value, _, title_id) in enumerate(
+            sorted(heap, reverse=True), 1
+        )
+    ]
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries)
+    bump_versions(LeaderboardEntry)
+    return len(entries)
@@ -0,0 +1,37 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.test.utils import setup_databases, teardown_databases
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """
+    Временная тестовая база с примененными миграциями,
+    чтобы бенчмарки не трогали рабочие данные.
+    """
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+
+
+def timings(func, repeat):
+    """Время выполнения func в миллисекундах, repeat замеров."""
+    result = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        result.append((time.perf_counter() - started) * 1000)
+    return result
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def median(values):
+    return statistics.median(values)
@@ -0,0 +1,67 @@
+"""
+Чтение csv для importcsv.
+Модуль не зависит от Django, чтобы его можно было
+запускать в отдельных процессах.
+"""
+import csv
+import queue
+from itertools import islice
+
+ERROR = 'error'
+QUEUE_TIMEOUT = 1
+
+
+class ParseError(Exception):
+    """Ошибка чтения csv в дочернем процессе."""
+
+
+def read_chunks(path, columns, batch_size):
+    """Читает из csv нужные колонки частями по batch_size строк."""
+    with open(path, encoding='utf-8', newline='') as csvfile:
+        reader = csv.DictReader(csvfile, delimiter=',')
+        rows = (tuple(row[column] for column in columns) for row in reader)
+        for chunk in iter(lambda: list(islice(rows, batch_size)), []):
+            yield chunk
+
+
+def _put(chunks, item, stop):
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=QUEUE_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def parse_file(path, columns, batch_size, chunks, stop):
+    """
+    Читает csv в дочернем процессе и передает части в очередь.
+    Конец файла отмечается None, ошибка — парой (ERROR, текст).
+    """
+    try:
+        for chunk in read_chunks(path, columns, batch_size):
+            if not _put(chunks, chunk, stop):
+                return
+    except Exception as error:
+        _put(chunks, (ERROR, f'{type(error).__name__}: {error}'), stop)
+        return
+    _put(chunks, None, stop)
+
+
+def iter_queue(chunks, future):
+    """Отдает части из очереди до конца файла или ошибки."""
+    while True:
+        try:
+            chunk = chunks.get(timeout=QUEUE_TIMEOUT)
+        except queue.Empty:
+            if future.done():
+                raise ParseError(
+                    future.exception() or 'Процесс чтения csv завершился'
+                )
+            continue
+        if chunk is None:
+            return
+        if isinstance(chunk, tuple) and chunk[0] == ERROR:
+            raise ParseError(chunk[1])
+        yield chunk
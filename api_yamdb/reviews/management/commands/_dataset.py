@@ -0,0 +1,99 @@
+import csv
+import os
+
+SYLLABLES = (
+    'ка', 'ро', 'ми', 'ла', 'то', 'ве', 'су', 'ни', 'да', 'ре',
+    'по', 'зи', 'ты', 'бо', 'ша', 'ле', 'му', 'га', 'хо', 'фе',
+)
+VOCABULARY_SIZE = 5000
+CATEGORIES = 5
+GENRES = 20
+PUB_DATE = '2020-01-{:02d}T12:00:00.000Z'
+
+
+def vocabulary(rnd, size=VOCABULARY_SIZE):
+    """Синтетический словарь из случайных слогов."""
+    return sorted({
+        ''.join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4)))
+        for _ in range(size)
+    })
+
+
+def write_rows(file_dir, name, header, rows):
+    with open(
+        os.path.join(file_dir, name), 'w', encoding='utf-8', newline=''
+    ) as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_dataset(file_dir, titles, reviews, comments, users, rnd):
+    """
+    Пишет синтетические файлы csv в формате static/data.
+    Отзывы распределяются по произведениям по кругу, поэтому
+    пользователей не меньше reviews / titles: пара автор-произведение
+    не повторяется. Возвращает количество строк по файлам.
+    """
+    users = max(users, -(-reviews // titles))
+    words = vocabulary(rnd)
+
+    def text(count):
+        return ' '.join(rnd.choices(words, k=count))
+
+    write_rows(file_dir, 'category.csv', ('id', 'name', 'slug'), (
+        (number, f'Категория {number}', f'category-{number}')
+        for number in range(1, CATEGORIES + 1)
+    ))
+    write_rows(file_dir, 'genre.csv', ('id', 'name', 'slug'), (
+        (number, f'Жанр {number}', f'genre-{number}')
+        for number in range(1, GENRES + 1)
+    ))
+    write_rows(
+        file_dir, 'users.csv',
+        ('id', 'username', 'email', 'role', 'bio', 'first_name',
+         'last_name'),
+        (
+            (number, f'user{number}', f'user{number}@yamdb.fake', 'user',
+             '', '', '')
+            for number in range(1, users + 1)
+        ),
+    )
+    write_rows(file_dir, 'titles.csv', ('id', 'name', 'year', 'category'), (
+        (number, text(rnd.randint(2, 4)), rnd.randint(1900, 2020),
+         rnd.randint(1, CATEGORIES))
+        for number in range(1, titles + 1)
+    ))
+    genre_titles = [
+        (title, genre)
+        for title in range(1, titles + 1)
+        for genre in rnd.sample(range(1, GENRES + 1), rnd.randint(1, 3))
+    ]
+    write_rows(file_dir, 'genre_title.csv', ('id', 'title_id', 'genre_id'), (
+        (number, title, genre)
+        for number, (title, genre) in enumerate(genre_titles, 1)
+    ))
+    write_rows(
+        file_dir, 'review.csv',
+        ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+        (
+            (number, (number - 1) % titles + 1, text(12),
+             (number - 1) // titles + 1, rnd.randint(1, 10),
+             PUB_DATE.format(number % 28 + 1))
+            for number in range(1, reviews + 1)
+        ),
+    )
+    write_rows(
+        file_dir, 'comments.csv',
+        ('id', 'review_id', 'text', 'author', 'pub_date'),
+        (
+            (number, (number - 1) % reviews + 1, text(8),
+             rnd.randint(1, users), PUB_DATE.format(number % 28 + 1))
+            for number in range(1, comments + 1)
+        ),
+    )
+    return {
+        'categories': CATEGORIES, 'genres': GENRES, 'users': users,
+        'titles': titles, 'genre_titles': len(genre_titles),
+        'reviews': reviews, 'comments': comments,
+    }
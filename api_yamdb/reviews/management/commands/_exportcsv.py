@@ -0,0 +1,64 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+
+from ._importcsv import FILE_NAMES, FILES
+
+EXPORT_DIR = os.path.join(settings.BASE_DIR, 'export')
+CHUNK_SIZE = 2000
+
+
+def iter_rows(model, fields, chunk_size):
+    """Строки таблицы кортежами, без создания объектов моделей."""
+    return model.objects.order_by('pk').values_list(*fields).iterator(
+        chunk_size=chunk_size
+    )
+
+
+def to_text(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_csv(path, columns, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as csvfile:
+        writer = csv.writer(csvfile, delimiter=',')
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([to_text(value) for value in row])
+
+
+def write_jsonl(path, columns, rows):
+    with open(path, 'w', encoding='utf-8') as jsonlfile:
+        for row in rows:
+            jsonlfile.write(json.dumps(
+                dict(zip(columns, map(to_text, row))), ensure_ascii=False
+            ))
+            jsonlfile.write('\n')
+
+
+def export_tables(file_dir=EXPORT_DIR, writer=write_csv, extension='.csv',
+                  chunk_size=CHUNK_SIZE, only=FILE_NAMES, report=print):
+    """
+    Выгружает таблицы в файлы того же формата, что читает importcsv.
+    Возвращает количество выгруженных файлов.
+    """
+    os.makedirs(file_dir, exist_ok=True)
+    exported = 0
+    for name, model, columns, _ in FILES:
+        if name not in only:
+            continue
+        path = os.path.join(
+            file_dir, os.path.splitext(name)[0] + extension
+        )
+        writer(
+            path, list(columns.values()),
+            iter_rows(model, list(columns), chunk_size),
+        )
+        exported += 1
+        report(f'Файл {path} выгружен.')
+    return exported
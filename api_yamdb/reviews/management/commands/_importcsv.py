@@ -1,128 +1,255 @@
-import csv
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 
 from django.conf import settings
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from django.db import transaction
+from reviews.models import (Category, Comment, Genre, ImportCheckpoint,
+                            Review, Title, User)
+from reviews.signals import VERSIONED_MODELS
+from reviews.versions import bump_versions
 
-FILE_DIR = os.path.join(
-    settings.BASE_DIR,
-    'static\\data'
+from ._csvreader import iter_queue, parse_file, read_chunks
+from ._ratings import rebuild_ratings
+
+FILE_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+BATCH_SIZE = 1000
+WORKERS = 1
+QUEUE_SIZE = 4
+
+# Файл, модель, поля модели и колонки csv, внешние ключи.
+# Порядок загрузки определяется внешними ключами.
+FILES = (
+    ('category.csv', Category,
+     {'id': 'id', 'name': 'name', 'slug': 'slug'}, {}),
+    ('genre.csv', Genre,
+     {'id': 'id', 'name': 'name', 'slug': 'slug'}, {}),
+    ('users.csv', User,
+     {'id': 'id', 'username': 'username', 'email': 'email',
+      'role': 'role', 'bio': 'bio', 'first_name': 'first_name',
+      'last_name': 'last_name'}, {}),
+    ('titles.csv', Title,
+     {'id': 'id', 'name': 'name', 'year': 'year',
+      'category_id': 'category'},
+     {'category_id': Category}),
+    ('genre_title.csv', Title.genre.through,
+     {'id': 'id', 'title_id': 'title_id', 'genre_id': 'genre_id'},
+     {'title_id': Title, 'genre_id': Genre}),
+    ('review.csv', Review,
+     {'id': 'id', 'title_id': 'title_id', 'text': 'text',
+      'author_id': 'author', 'score': 'score', 'pub_date': 'pub_date'},
+     {'title_id': Title, 'author_id': User}),
+    ('comments.csv', Comment,
+     {'id': 'id', 'review_id': 'review_id', 'text': 'text',
+      'author_id': 'author', 'pub_date': 'pub_date'},
+     {'review_id': Review, 'author_id': User}),
 )
+FILE_NAMES = tuple(name for name, *_ in FILES)
 
 
-def import_csv():
-    with open(
-        os.path.join(FILE_DIR, "category.csv"), encoding="utf-8"
-    ) as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=",")
-        Category.objects.bulk_create(objs=[
-            Category(
-                id=row['id'],
-                name=row['name'],
-                slug=row['slug'],
-            )
-            for row in reader
-        ])
-        print(f'Файл {csvfile.name} загружен.')
-
-    with open(
-        os.path.join(FILE_DIR, "genre.csv"), encoding="utf-8"
-    ) as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=",")
-        Genre.objects.bulk_create(objs=[
-            Genre(
-                id=row['id'],
-                name=row['name'],
-                slug=row['slug'],
-            )
-            for row in reader
-        ])
-        print(f'Файл {csvfile.name} загружен.')
-
-    with open(
-        os.path.join(FILE_DIR, "users.csv"), encoding="utf-8"
-    ) as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=",")
-        User.objects.bulk_create(objs=[
-            User(
-                id=row['id'],
-                username=row['username'],
-                email=row['email'],
-                role=row['role'],
-                bio=row['bio'],
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-            )
-            for row in reader
-        ])
-        print(f'Файл {csvfile.name} загружен.')
-
-    with open(
-        os.path.join(FILE_DIR, "titles.csv"), encoding="utf-8"
-    ) as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=",")
-        Title.objects.bulk_create(objs=[
-            Title(
-                id=row['id'],
-                name=row['name'],
-                year=row['year'],
-                category=Category.objects.get_or_create(
-                    id=row['category']
-                )[0],
-            )
-            for row in reader
-        ])
-        print(f'Файл {csvfile.name} загружен.')
-
-    with open(
-        os.path.join(FILE_DIR, "genre_title.csv"), encoding="utf-8"
-    ) as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=",")
-        for row in reader:
-            title, created = Title.objects.get_or_create(
-                id=row['title_id']
-            )
-            genre, created = Genre.objects.get_or_create(
-                id=row['genre_id']
-            )
-            title.genre.add(genre)
-            title.save()
-        print(f'Файл {csvfile.name} загружен.')
-
-    with open(
-        os.path.join(FILE_DIR, "review.csv"), encoding="utf-8"
-    ) as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=",")
-        Review.objects.bulk_create(objs=[
-            Review(
-                id=row['id'],
-                title=Title.objects.get_or_create(
-                    id=row['title_id'])[0],
-                text=row['text'],
-                author=User.objects.get_or_create(
-                    id=row['author'])[0],
-                score=row['score'],
-                pub_date=row['pub_date'],
-            )
-            for row in reader
-        ])
-        print(f'Файл {csvfile.name} загружен.')
-
-    with open(
-        os.path.join(FILE_DIR, "comments.csv"), encoding="utf-8"
-    ) as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=",")
-        Comment.objects.bulk_create(objs=[
-            Comment(
-                review=Review.objects.get_or_create(
-                    id=row['review_id']
-                )[0],
-                text=row['text'],
-                author=User.objects.get_or_create(
-                    id=row['author']
-                )[0],
-                pub_date=row['pub_date'],
+class ImportFileError(Exception):
+    """Ошибка загрузки одного файла."""
+
+    def __init__(self, name, error):
+        super().__init__(f'{name}: {error}')
+        self.name = name
+        self.error = error
+
+
+class SkippedRowsError(Exception):
+    """В файле есть строки со ссылками на несуществующие записи."""
+
+    def __init__(self, skipped):
+        super().__init__(f'строк со ссылками на несуществующие записи: '
+                         f'{skipped}')
+        self.skipped = skipped
+
+
+def file_dependencies(files):
+    """Файлы, на записи которых ссылается каждый файл."""
+    loaders = {model: name for name, model, _, _ in files}
+    return {
+        name: {loaders[model] for model in foreign_keys.values()}
+        for name, _, _, foreign_keys in files
+    }
+
+
+def with_dependencies(names, files):
+    """Файлы names вместе со всеми файлами, от которых они зависят."""
+    depends = file_dependencies(files)
+    closure, stack = set(), list(names)
+    while stack:
+        name = stack.pop()
+        if name not in closure:
+            closure.add(name)
+            stack.extend(depends[name])
+    return closure
+
+
+def dependency_levels(files):
+    """
+    Группирует файлы по уровням.
+    Файлы одного уровня зависят только от файлов предыдущих уровней.
+    """
+    depends = file_dependencies(files)
+    levels, placed = [], set()
+    while len(placed) < len(files):
+        level = [
+            spec for spec in files
+            if spec[0] not in placed and depends[spec[0]] <= placed
+        ]
+        if not level:
+            raise ValueError('Циклическая зависимость между файлами csv')
+        levels.append(level)
+        placed.update(name for name, *_ in level)
+    return levels
+
+
+@contextmanager
+def keep_pub_date(model):
+    """Отключает auto_now_add, чтобы сохранить даты из csv."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def chunk_sources(workers):
+    """
+    Возвращает функцию, открывающую csv как поток частей.
+    При workers > 1 файлы читаются в пуле процессов заранее,
+    очередь ограничена QUEUE_SIZE частями.
+    """
+    if workers <= 1:
+        yield read_chunks
+        return
+    with multiprocessing.Manager() as manager, \
+            ProcessPoolExecutor(workers) as pool:
+        stop = manager.Event()
+
+        def open_chunks(path, columns, batch_size):
+            chunks = manager.Queue(QUEUE_SIZE)
+            future = pool.submit(
+                parse_file, path, list(columns), batch_size, chunks, stop
             )
-            for row in reader
-        ])
-        print(f'Файл {csvfile.name} загружен.')
+            return iter_queue(chunks, future)
+
+        try:
+            yield open_chunks
+        finally:
+            stop.set()
+
+
+class KnownIds(dict):
+    """Множества id, уже существующих в базе, по моделям."""
+
+    def __missing__(self, model):
+        ids = self[model] = set(
+            model.objects.values_list('pk', flat=True).iterator()
+        )
+        return ids
+
+
+def import_file(name, model, columns, foreign_keys, chunks, known_ids):
+    """
+    Загружает один файл в транзакции и отмечает его загруженным.
+    Если в файле есть строки со ссылками на несуществующие записи,
+    транзакция откатывается и файл не отмечается загруженным,
+    иначе повторный импорт уже не загрузил бы эти строки.
+    Возвращает количество загруженных строк.
+    """
+    fields = tuple(columns)
+    checks = [
+        (fields.index(field), fk_model)
+        for field, fk_model in foreign_keys.items()
+    ]
+    loaded = skipped = 0
+    with transaction.atomic(), keep_pub_date(model):
+        for chunk in chunks:
+            objs = []
+            for values in chunk:
+                if any(
+                    int(values[index]) not in known_ids[fk_model]
+                    for index, fk_model in checks
+                ):
+                    skipped += 1
+                    continue
+                objs.append(model(**dict(zip(fields, values))))
+            model.objects.bulk_create(objs)
+            loaded += len(objs)
+        if skipped:
+            raise SkippedRowsError(skipped)
+        ImportCheckpoint.objects.create(filename=name, rows=loaded)
+    known_ids.pop(model, None)
+    return loaded
+
+
+def import_csv(file_dir=FILE_DIR, batch_size=BATCH_SIZE, workers=WORKERS,
+               only=FILE_NAMES, report=print):
+    """
+    Загружает файлы csv по уровням зависимостей.
+    Уже загруженные файлы пропускаются, поэтому прерванный
+    импорт продолжается с места остановки. Незагруженные файлы,
+    от которых зависят файлы из only, загружаются вместе с ними.
+    """
+    finished = set(
+        ImportCheckpoint.objects.values_list('filename', flat=True)
+    )
+    wanted = with_dependencies(only, FILES)
+    for name in FILE_NAMES:
+        if name in wanted and name not in only and name not in finished:
+            report(f'Файл {name} не загружен, от него зависят указанные'
+                   ' файлы: загружается тоже.')
+    known_ids = KnownIds()
+    loaded_any = False
+    with chunk_sources(workers) as open_chunks:
+        for level in dependency_levels(FILES):
+            pending = []
+            for spec in level:
+                if spec[0] not in wanted:
+                    continue
+                if spec[0] in finished:
+                    if spec[0] in only:
+                        report(f'Файл {spec[0]} уже загружен, пропущен.')
+                    continue
+                pending.append(spec)
+            sources = [
+                open_chunks(
+                    os.path.join(file_dir, name), columns.values(),
+                    batch_size,
+                )
+                for name, _, columns, _ in pending
+            ]
+            for (name, model, columns, foreign_keys), chunks in zip(
+                pending, sources
+            ):
+                started = time.monotonic()
+                try:
+                    loaded = import_file(
+                        name, model, columns, foreign_keys, chunks,
+                        known_ids,
+                    )
+                except Exception as error:
+                    raise ImportFileError(name, error) from error
+                loaded_any = True
+                elapsed = time.monotonic() - started
+                report(
+                    f'Файл {name} загружен: {loaded} строк'
+                    f' ({loaded / max(elapsed, 1e-6):.0f} строк/с).'
+                )
+
+    if loaded_any:
+        rebuild_ratings()
+        # Строки вставлены без сигналов: версия ImportCheckpoint
+        # сбрасывает и версии отдельных произведений и отзывов.
+        bump_versions(*VERSIONED_MODELS, ImportCheckpoint)
@@ -0,0 +1,49 @@
+from django.db import connection
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from reviews.models import Review, ScoreCount, Title
+from reviews.signals import RATING_FROM_SUM
+from reviews.versions import bump_versions
+
+
+def rebuild_score_counts():
+    """
+    Пересчитывает гистограммы оценок всех произведений
+    одним проходом GROUP BY по отзывам, без выгрузки в Python.
+    """
+    ScoreCount.objects.all().delete()
+    quote = connection.ops.quote_name
+    title = quote(Review._meta.get_field('title').column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(ScoreCount._meta.db_table)}'
+            f' ({quote(ScoreCount._meta.get_field("title").column)},'
+            f' {quote("score")}, {quote("count")})'
+            f' SELECT {title}, {quote("score")}, COUNT(*)'
+            f' FROM {quote(Review._meta.db_table)}'
+            f' GROUP BY {title}, {quote("score")}'
+        )
+
+
+def rebuild_ratings():
+    """
+    Пересчитывает сохраненные рейтинги и гистограммы оценок
+    всех произведений с нуля.
+    """
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    Title.objects.update(
+        rating_sum=Coalesce(Subquery(
+            reviews.annotate(total=Sum('score')).values('total'),
+            output_field=IntegerField(),
+        ), 0),
+        rating_count=Coalesce(Subquery(
+            reviews.annotate(total=Count('id')).values('total'),
+            output_field=IntegerField(),
+        ), 0),
+    )
+    Title.objects.update(rating=RATING_FROM_SUM)
+    rebuild_score_counts()
+    bump_versions(Title)
+    return Title.objects.count()
@@ -0,0 +1,194 @@
+import json
+import random
+import tempfile
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.authentication import token_for_user
+from reviews.leaderboards import refresh_leaderboards
+from reviews.models import Title, User
+
+from ._bench import median, percentile, scratch_database, timings
+from ._dataset import write_dataset
+from ._importcsv import import_csv
+
+# Маршрут, адрес, нужен ли токен администратора.
+ENDPOINTS = (
+    ('titles-list', '/api/v1/titles/', False),
+    ('titles-list genre', '/api/v1/titles/?genre=genre-1', False),
+    ('titles-list search', '/api/v1/titles/?search={word}', False),
+    ('titles-list sparse', '/api/v1/titles/?fields=id,name,rating', False),
+    ('titles-detail', '/api/v1/titles/1/', False),
+    ('titles-bundle', '/api/v1/titles/1/bundle/', False),
+    ('titles-stats', '/api/v1/titles/1/stats/', False),
+    ('leaderboards', '/api/v1/leaderboards/?genre=genre-1', False),
+    ('categories-list', '/api/v1/categories/', False),
+    ('genres-list', '/api/v1/genres/', False),
+    ('reviews-list', '/api/v1/titles/1/reviews/', False),
+    ('reviews-list cursor',
+     '/api/v1/titles/1/reviews/?pagination=cursor', False),
+    ('reviews-detail', '/api/v1/titles/1/reviews/1/', False),
+    ('comments-list', '/api/v1/titles/1/reviews/1/comments/', False),
+    ('comments-detail', '/api/v1/titles/1/reviews/1/comments/1/', False),
+    ('users-list', '/api/v1/users/', True),
+    ('users-me', '/api/v1/users/me/', True),
+)
+DUMMY_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    """Бенчмарк эндпоинтов v1 на синтетических данных."""
+
+    help = (
+        'Заполняет временную базу синтетическими данными через importcsv,'
+        ' измеряет скорость импорта, p50/p95 и количество SQL-запросов'
+        ' эндпоинтов. Результат можно сохранить в json и сравнить'
+        ' с сохраненным ранее.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=40000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--cache', action='store_true',
+            help='Не отключать кэш ответов.',
+        )
+        parser.add_argument('--output', help='Файл для результатов json.')
+        parser.add_argument(
+            '--baseline',
+            help='Результаты json, с которыми сравнивать.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимое ухудшение p95 и скорости импорта, доля.',
+        )
+
+    def seed(self, kwargs, rnd):
+        with tempfile.TemporaryDirectory() as file_dir:
+            started = time.perf_counter()
+            sizes = write_dataset(
+                file_dir, kwargs['titles'], kwargs['reviews'],
+                kwargs['comments'], kwargs['users'], rnd,
+            )
+            self.stdout.write(
+                f'Данные сгенерированы за {time.perf_counter() - started:.1f}'
+                f' с: {sizes}'
+            )
+            started = time.perf_counter()
+            import_csv(file_dir, report=self.stdout.write)
+            elapsed = time.perf_counter() - started
+        rows = sum(sizes.values())
+        return sizes, {
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(rows / elapsed),
+        }
+
+    def measure(self, repeat, word):
+        admin = User.objects.create(username='bench-admin', role='admin')
+        anonymous, authorized = APIClient(), APIClient()
+        authorized.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {token_for_user(admin)}'
+        )
+        results = {}
+        for name, url, admin_only in ENDPOINTS:
+            url = url.format(word=word)
+            client = authorized if admin_only else anonymous
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{name}: {url} ответил {response.status_code}'
+                )
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            # Каждый запрос клиента очищает журнал SQL, считаем сразу.
+            query_count = len(queries)
+            elapsed = timings(lambda: client.get(url), repeat)
+            results[name] = {
+                'url': url,
+                'p50_ms': round(median(elapsed), 2),
+                'p95_ms': round(percentile(elapsed, 95), 2),
+                'queries': query_count,
+            }
+            self.stdout.write(
+                f'{name:<22} p50 {results[name]["p50_ms"]:>8.2f} мс'
+                f'  p95 {results[name]["p95_ms"]:>8.2f} мс'
+                f'  SQL {results[name]["queries"]}'
+            )
+        return results
+
+    def compare(self, results, baseline, tolerance):
+        """Список ухудшений по сравнению с baseline."""
+        regressions = []
+        for name, base in baseline['endpoints'].items():
+            current = results['endpoints'].get(name)
+            if current is None:
+                continue
+            if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p95 {base["p95_ms"]} -> {current["p95_ms"]} мс'
+                )
+            if current['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: SQL {base["queries"]} -> {current["queries"]}'
+                )
+        base_speed = baseline['import']['rows_per_second']
+        speed = results['import']['rows_per_second']
+        if speed < base_speed * (1 - tolerance):
+            regressions.append(f'importcsv: {base_speed} -> {speed} строк/с')
+        return regressions
+
+    def handle(self, *args, **kwargs):
+        baseline = None
+        if kwargs['baseline']:
+            with open(kwargs['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        rnd = random.Random(kwargs['seed'])
+        with override_settings(DEBUG=False), scratch_database():
+            sizes, imported = self.seed(kwargs, rnd)
+            self.stdout.write(
+                f'Импорт: {imported["rows"]} строк за'
+                f' {imported["seconds"]} с'
+                f' ({imported["rows_per_second"]} строк/с)'
+            )
+            started = time.perf_counter()
+            refresh_leaderboards()
+            imported['leaderboards_seconds'] = round(
+                time.perf_counter() - started, 3
+            )
+            self.stdout.write(
+                f'Рейтинги пересобраны за {imported["leaderboards_seconds"]} с'
+            )
+            word = Title.objects.get(pk=1).name.split()[0]
+            caches = {} if kwargs['cache'] else {'CACHES': DUMMY_CACHE}
+            with override_settings(ALLOWED_HOSTS=['*'], **caches):
+                endpoints = self.measure(kwargs['repeat'], word)
+        results = {
+            'scale': sizes,
+            'repeat': kwargs['repeat'],
+            'cache': kwargs['cache'],
+            'import': imported,
+            'endpoints': endpoints,
+        }
+        if kwargs['output']:
+            with open(kwargs['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {kwargs["output"]}')
+        if baseline is None:
+            return
+        regressions = self.compare(results, baseline, kwargs['tolerance'])
+        if regressions:
+            raise CommandError(
+                'Ухудшения относительно baseline:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Ухудшений нет'))
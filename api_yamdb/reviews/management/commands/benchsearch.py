@@ -0,0 +1,70 @@
+import random
+
+from django.core.management import BaseCommand
+from reviews.models import Category, Title
+from reviews.search import search_titles
+
+from ._bench import median, scratch_database, timings
+from ._dataset import vocabulary
+
+
+class Command(BaseCommand):
+    """Сравнение полнотекстового поиска с фильтром contains."""
+
+    help = (
+        'Заполняет временную базу произведениями и сравнивает'
+        ' search= с фильтром name contains.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--terms', nargs='+',
+            help='Поисковые запросы, по умолчанию слова из словаря.',
+        )
+
+    def seed(self, count, rnd):
+        """Создает произведения из слов синтетического словаря."""
+        words = vocabulary(rnd)
+        category = Category.objects.create(name='Бенчмарк', slug='bench')
+        Title.objects.bulk_create(
+            Title(
+                name=' '.join(rnd.sample(words, rnd.randint(2, 4))),
+                description=' '.join(rnd.choices(words, k=10)),
+                year=rnd.randint(1900, 2020),
+                category=category,
+            )
+            for _ in range(count)
+        )
+        return words
+
+    def handle(self, *args, **kwargs):
+        rnd = random.Random(kwargs['seed'])
+        with scratch_database():
+            words = self.seed(kwargs['titles'], rnd)
+            terms = kwargs['terms'] or [
+                *rnd.sample(words, 3),
+                ' '.join(rnd.sample(words, 2)),
+                rnd.choice(words)[:4],
+            ]
+            self.stdout.write(
+                f'Произведений: {Title.objects.count()}, '
+                f'замеров: {kwargs["repeat"]}, медиана в мс.'
+            )
+            for term in terms:
+                contains = Title.objects.filter(name__contains=term)
+                search = search_titles(Title.objects.all(), term)
+                rows = []
+                for label, queryset in (
+                    ('contains', contains), ('search', search)
+                ):
+                    def page(queryset=queryset):
+                        queryset.count()
+                        list(queryset[:10])
+                    elapsed = median(timings(page, kwargs['repeat']))
+                    rows.append(
+                        f'{label} {elapsed:.2f} ({queryset.count()} найдено)'
+                    )
+                self.stdout.write(f'{term!r}: ' + ', '.join(rows))
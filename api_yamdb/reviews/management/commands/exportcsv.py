@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand
+
+from ._exportcsv import CHUNK_SIZE, EXPORT_DIR, export_tables, write_csv
+from ._importcsv import FILE_NAMES
+
+
+class Command(BaseCommand):
+    """Экспорт данных в csv."""
+
+    help = 'Выгружает базу данных в файлы csv в формате importcsv.'
+    writer = staticmethod(write_csv)
+    extension = '.csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=EXPORT_DIR,
+            help='Папка для выгружаемых файлов.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Количество строк, читаемых из базы за раз.',
+        )
+        parser.add_argument(
+            '--only', nargs='+', choices=FILE_NAMES, default=FILE_NAMES,
+            metavar='FILE',
+            help='Выгрузить только указанные таблицы: '
+                 + ', '.join(FILE_NAMES),
+        )
+
+    def handle(self, *args, **kwargs):
+        count = export_tables(
+            kwargs['path'], self.writer, self.extension,
+            kwargs['chunk_size'], kwargs['only'], self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено файлов: {count}'
+        ))
@@ -0,0 +1,10 @@
+from ._exportcsv import write_jsonl
+from .exportcsv import Command as ExportCsvCommand
+
+
+class Command(ExportCsvCommand):
+    """Экспорт данных в jsonl."""
+
+    help = 'Выгружает базу данных в файлы jsonl, по строке на запись.'
+    writer = staticmethod(write_jsonl)
+    extension = '.jsonl'
@@ -1,28 +1,64 @@
 from django.core.management import BaseCommand, CommandError
 from django.db.utils import IntegrityError
 
-from ._importcsv import import_csv
+from ._importcsv import (BATCH_SIZE, FILE_DIR, FILE_NAMES, WORKERS,
+                         ImportFileError, SkippedRowsError, import_csv)
 
 
 class Command(BaseCommand):
     """Импортер данных из csv."""
 
-    help = 'Импорт данных csv из /static/data/ в базу данных.'
+    help = (
+        'Импорт данных csv из /static/data/ в базу данных.'
+        ' Загруженные файлы запоминаются, повторный запуск'
+        ' продолжает прерванный импорт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=FILE_DIR,
+            help='Папка с файлами csv.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество строк, читаемых и вставляемых за раз.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=WORKERS,
+            help='Количество процессов для чтения csv, 1 — без пула.',
+        )
+        parser.add_argument(
+            '--only', nargs='+', choices=FILE_NAMES, default=FILE_NAMES,
+            metavar='FILE',
+            help='Загрузить только указанные файлы и незагруженные'
+                 ' файлы, от которых они зависят: '
+                 + ', '.join(FILE_NAMES),
+        )
 
     def handle(self, *args, **kwargs):
         try:
-            import_csv()
-        except IntegrityError:
-            raise CommandError(
-                'Очистите базу данных перед загрузкой файлов csv,'
-                ' воспользуйтесь менеджмент командой flush')
-        except FileNotFoundError:
-            raise CommandError(
-                'Файлы csv в папке static/data не найдены')
-        except Exception:
+            import_csv(
+                kwargs['path'], kwargs['batch_size'], kwargs['workers'],
+                kwargs['only'], self.stdout.write,
+            )
+        except ImportFileError as error:
+            if isinstance(error.error, IntegrityError):
+                raise CommandError(
+                    f'Файл {error.name} конфликтует с данными в базе:'
+                    f' {error.error}. Очистите базу данных перед загрузкой'
+                    ' файлов csv, воспользуйтесь менеджмент командой flush')
+            if isinstance(error.error, SkippedRowsError):
+                raise CommandError(
+                    f'В файле {error.name} {error.error}.'
+                    ' Файл не загружен, исправьте его и запустите'
+                    ' импорт повторно')
+            if isinstance(error.error, FileNotFoundError):
+                raise CommandError(
+                    f'Файл {error.name} в папке {kwargs["path"]} не найден')
             raise CommandError(
-                'Непредвиденная ошибка при выполнении команды importcsv,'
-                ' обратитесь к разработчикам'
+                f'Ошибка при загрузке файла {error.name}: {error.error}.'
+                ' Загруженные файлы сохранены, повторный запуск'
+                ' продолжит импорт'
             )
 
         self.stdout.write(self.style.SUCCESS(
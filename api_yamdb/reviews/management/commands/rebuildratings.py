@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from ._ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    """Пересчет сохраненных рейтингов произведений."""
+
+    help = (
+        'Пересчитывает рейтинги и гистограммы оценок всех произведений'
+        ' по отзывам.'
+    )
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            count = rebuild_ratings()
+        self.stdout.write(self.style.SUCCESS(
+            'Рейтинги и гистограммы оценок пересчитаны'
+            f' для {count} произведений'
+        ))
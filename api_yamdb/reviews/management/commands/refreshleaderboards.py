@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from reviews.leaderboards import refresh_leaderboards
+
+
+class Command(BaseCommand):
+    """Пересборка рейтингов произведений."""
+
+    help = (
+        'Пересобирает рейтинги top_rated, most_reviewed и trending'
+        ' для всех произведений, категорий и жанров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=settings.LEADERBOARD_SIZE,
+            help='Количество мест в каждом рейтинге.',
+        )
+        parser.add_argument(
+            '--prior-weight', type=int,
+            default=settings.LEADERBOARD_PRIOR_WEIGHT,
+            help='Вес средней оценки в байесовском среднем, в отзывах;'
+                 ' 0 — обычное среднее.',
+        )
+        parser.add_argument(
+            '--min-reviews', type=int,
+            default=settings.LEADERBOARD_MIN_REVIEWS,
+            help='Наименьшее количество отзывов для top_rated.',
+        )
+        parser.add_argument(
+            '--trending-days', type=int,
+            default=settings.LEADERBOARD_TRENDING_DAYS,
+            help='Окно trending в днях.',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Пересобирать рейтинги постоянно.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=600,
+            help='Пауза между пересборками, секунд.',
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            started = time.perf_counter()
+            count = refresh_leaderboards(
+                kwargs['size'], kwargs['prior_weight'],
+                kwargs['min_reviews'], kwargs['trending_days'],
+            )
+            self.stdout.write(
+                f'Рейтинги пересобраны: {count} мест'
+                f' за {time.perf_counter() - started:.1f} с'
+            )
+            if not kwargs['loop']:
+                break
+            time.sleep(kwargs['interval'])
@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from reviews.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    """Отправка писем из очереди."""
+
+    help = 'Отправляет письма из очереди исходящих писем.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+            help='Количество писем, отправляемых за один проход.',
+        )
+        parser.add_argument(
+            '--max-attempts', type=int,
+            default=settings.OUTBOX_MAX_ATTEMPTS,
+            help='Количество попыток до отметки письма неотправленным.',
+        )
+        parser.add_argument(
+            '--backoff', type=int, default=settings.OUTBOX_BACKOFF,
+            help='Задержка перед первым повтором в секундах.',
+        )
+        parser.add_argument(
+            '--lease', type=int, default=settings.OUTBOX_LEASE,
+            help='На сколько секунд письма берутся в работу.',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать постоянно, опрашивая очередь.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проходами при пустой очереди, секунд.',
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            sent, failed = deliver_batch(
+                kwargs['batch_size'], kwargs['max_attempts'],
+                kwargs['backoff'], kwargs['lease'],
+            )
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, с ошибкой: {failed}'
+                )
+            if not kwargs['loop']:
+                break
+            if sent + failed < kwargs['batch_size']:
+                time.sleep(kwargs['interval'])
@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    """Копирование основной базы SQLite в файлы-реплики."""
+
+    help = (
+        'Копирует основную базу SQLite в файлы из DB_REPLICAS.'
+        ' Заменяет репликацию при локальной проверке чтения с реплик.'
+    )
+
+    def handle(self, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены, задайте DB_REPLICAS')
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Команда работает только с SQLite, реплики PostgreSQL'
+                ' обновляет потоковая репликация'
+            )
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'Реплика {alias} обновлена.')
+        self.stdout.write(self.style.SUCCESS('Реплики обновлены'))
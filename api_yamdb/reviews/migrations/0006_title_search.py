@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+from reviews import search
+
+
+def install_search(apps, schema_editor):
+    search.install(schema_editor)
+
+
+def uninstall_search(apps, schema_editor):
+    search.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='description',
+            field=models.TextField(blank=True, max_length=256, verbose_name='Описание'),
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_scorecount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('top_rated', 'Лучшие по оценкам'), ('most_reviewed', 'Больше всего отзывов'), ('trending', 'Набирающие популярность')], max_length=13, verbose_name='Рейтинг')),
+                ('scope', models.CharField(choices=[('global', 'Все произведения'), ('category', 'Категория'), ('genre', 'Жанр')], max_length=8, verbose_name='Область')),
+                ('scope_id', models.PositiveIntegerField(default=0, verbose_name='id категории или жанра')),
+                ('position', models.PositiveIntegerField(verbose_name='Место')),
+                ('value', models.FloatField(verbose_name='Значение')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='reviews.Title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Места в рейтингах',
+                'ordering': ('board', 'scope', 'scope_id', 'position'),
+                'default_related_name': 'leaderboard_entries',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('board', 'scope', 'scope_id', 'position'), name='unique_leaderboard_position'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_fields_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Поля токена изменены'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     validate_slug)
 from django.db import models
+from django.utils import timezone
 
 from .validators import UsernameRegexValidator, username_me, validate_year
 
@@ -97,8 +98,17 @@ class User(AbstractUser):
         'Биография',
         blank=True,
     )
+    token_fields_changed_at = models.DateTimeField(
+        'Поля токена изменены',
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     REQUIRED_FIELDS = ('email', )
+    # Поля, которые копируются в JWT и проверяются правами доступа.
+    TOKEN_FIELDS = ('username', 'role', 'is_staff', 'is_superuser',
+                    'is_active')
 
     class Meta:
         ordering = ('id',)
@@ -111,6 +121,15 @@ class User(AbstractUser):
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженные из базы поля токена."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_token_fields = tuple(
+            instance.__dict__.get(field) for field in cls.TOKEN_FIELDS
+        )
+        return instance
+
     @property
     def is_moderator(self):
         return self.role == self.MODERATOR
@@ -152,7 +171,6 @@ class Title(models.Model):
     )
     description = models.TextField(
         'Описание',
-        db_index=True,
         max_length=settings.LENG_MAX,
         blank=True,
     )
@@ -171,17 +189,53 @@ class Title(models.Model):
         db_index=True,
         validators=(validate_year,),
     )
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок',
+        default=0,
+        editable=False,
+    )
+    rating = models.FloatField(
+        'Рейтинг',
+        null=True,
+        db_index=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('name',)
+        indexes = [
+            models.Index(
+                fields=('category', 'name', 'id'),
+                name='title_category_name_idx',
+            ),
+            models.Index(
+                fields=('category', 'rating', 'id'),
+                name='title_category_rating_idx',
+            ),
+            models.Index(
+                fields=('category', 'year', 'id'),
+                name='title_category_year_idx',
+            ),
+            models.Index(
+                fields=('rating_count', 'id'),
+                name='title_rating_count_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Review(ReviewAndCommentModel):
+    """Модель отзыва на произведение."""
+
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
@@ -210,6 +264,28 @@ class Review(ReviewAndCommentModel):
                 name='unique_review',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('title', '-pub_date', 'id'),
+                name='review_title_pub_date_idx',
+            )
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженные из базы произведение и оценку."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_title_id = instance.__dict__.get('title_id')
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        """Перечитанные произведение и оценка тоже считаются загруженными."""
+        super().refresh_from_db(using, fields)
+        if fields is None or 'title' in fields or 'title_id' in fields:
+            self._loaded_title_id = self.title_id
+        if fields is None or 'score' in fields:
+            self._loaded_score = self.score
 
 
 class Comment(ReviewAndCommentModel):
@@ -225,3 +301,177 @@ class Comment(ReviewAndCommentModel):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
+        indexes = [
+            models.Index(
+                fields=('review', '-pub_date', 'id'),
+                name='comment_review_pub_date_idx',
+            )
+        ]
+
+
+class ScoreCount(models.Model):
+    """
+    Количество оценок одного значения у произведения.
+    Гистограмма оценок поддерживается сигналами отзывов
+    и пересчитывается командой rebuildratings.
+    """
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        verbose_name='Произведение',
+    )
+    score = models.PositiveSmallIntegerField('Оценка')
+    count = models.PositiveIntegerField('Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Количество оценок'
+        verbose_name_plural = 'Количество оценок'
+        default_related_name = 'score_counts'
+        ordering = ('score',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('title', 'score'),
+                name='unique_title_score',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.title_id}: {self.score} x {self.count}'
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Место произведения в рейтинге.
+    Таблица целиком пересобирается командой refreshleaderboards.
+    """
+
+    TOP_RATED = 'top_rated'
+    MOST_REVIEWED = 'most_reviewed'
+    TRENDING = 'trending'
+
+    BOARD_CHOICES = (
+        (TOP_RATED, 'Лучшие по оценкам'),
+        (MOST_REVIEWED, 'Больше всего отзывов'),
+        (TRENDING, 'Набирающие популярность'),
+    )
+
+    GLOBAL = 'global'
+    CATEGORY = 'category'
+    GENRE = 'genre'
+
+    SCOPE_CHOICES = (
+        (GLOBAL, 'Все произведения'),
+        (CATEGORY, 'Категория'),
+        (GENRE, 'Жанр'),
+    )
+
+    board = models.CharField(
+        'Рейтинг',
+        max_length=max(len(board) for board, _ in BOARD_CHOICES),
+        choices=BOARD_CHOICES,
+    )
+    scope = models.CharField(
+        'Область',
+        max_length=max(len(scope) for scope, _ in SCOPE_CHOICES),
+        choices=SCOPE_CHOICES,
+    )
+    scope_id = models.PositiveIntegerField(
+        'id категории или жанра',
+        default=0,
+    )
+    position = models.PositiveIntegerField('Место')
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        verbose_name='Произведение',
+    )
+    value = models.FloatField('Значение')
+
+    class Meta:
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Места в рейтингах'
+        default_related_name = 'leaderboard_entries'
+        ordering = ('board', 'scope', 'scope_id', 'position')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('board', 'scope', 'scope_id', 'position'),
+                name='unique_leaderboard_position',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.board} {self.scope} {self.scope_id}: {self.position}'
+
+
+class ImportCheckpoint(models.Model):
+    """Файл csv, полностью загруженный командой importcsv."""
+
+    filename = models.CharField(
+        'Файл',
+        max_length=settings.LENG_MAX,
+        unique=True,
+    )
+    rows = models.PositiveIntegerField('Загружено строк')
+    loaded_at = models.DateTimeField(
+        'Дата загрузки',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'Загруженный файл'
+        verbose_name_plural = 'Загруженные файлы'
+        ordering = ('loaded_at',)
+
+    def __str__(self):
+        return self.filename
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку."""
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField('Тема', max_length=settings.LENG_MAX)
+    body = models.TextField('Текст')
+    from_email = models.EmailField(
+        'Отправитель',
+        max_length=settings.LENG_EMAIL,
+    )
+    recipients = models.TextField('Получатели через запятую')
+    status = models.CharField(
+        'Статус',
+        max_length=max(len(status) for status, _ in STATUS_CHOICES),
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ('next_attempt_at',)
+        indexes = [
+            models.Index(
+                fields=('status', 'next_attempt_at'),
+                name='outgoing_email_queue_idx',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.subject[:settings.LENG_CUT]} -> {self.recipients}'
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """
+    Ставит письмо в очередь на отправку.
+    При EMAIL_DELIVERY = 'sync' письмо отправляется сразу.
+    """
+    if settings.EMAIL_DELIVERY == 'sync':
+        send_mail(subject, message, from_email, recipient_list)
+        return None
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=','.join(recipient_list),
+    )
+
+
+def claim_batch(batch_size, lease):
+    """
+    Берет в работу письма, которым пора отправляться.
+    Короткая транзакция только переносит next_attempt_at на lease секунд
+    вперед и засчитывает попытку, письма отправляются уже после нее:
+    запись в базу не ждет почтовый сервер. Если обработчик упадет,
+    письма снова станут доступны, когда истечет lease.
+    Там, где база это умеет, строки блокируются с SKIP LOCKED,
+    чтобы несколько обработчиков не взяли одно письмо дважды;
+    на SQLite то же дает BEGIN IMMEDIATE.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING,
+            next_attempt_at__lte=now,
+        ).order_by('next_attempt_at')
+        if connection.features.has_select_for_update_skip_locked:
+            emails = emails.select_for_update(skip_locked=True)
+        emails = list(emails[:batch_size])
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(
+            next_attempt_at=now + timedelta(seconds=lease),
+            attempts=F('attempts') + 1,
+        )
+    for email in emails:
+        email.attempts += 1
+    return emails
+
+
+def deliver_batch(batch_size=settings.OUTBOX_BATCH_SIZE,
+                  max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+                  backoff=settings.OUTBOX_BACKOFF,
+                  lease=settings.OUTBOX_LEASE):
+    """
+    Отправляет пачку писем через одно соединение с почтовым сервером.
+    Отправка идет вне транзакции, результат каждого письма
+    сохраняется сразу после его отправки.
+    Неудачные попытки повторяются с экспоненциальной задержкой
+    backoff * 2 ** (попытка - 1) секунд, после max_attempts
+    письмо помечается неотправленным.
+    Возвращает количество отправленных и неудачных писем.
+    """
+    sent = failed = 0
+    emails = claim_batch(batch_size, lease)
+    if not emails:
+        return sent, failed
+    try:
+        mail_connection = get_connection()
+    except Exception as error:
+        mail_connection, connection_error = None, error
+    for email in emails:
+        try:
+            if mail_connection is None:
+                raise connection_error
+            EmailMessage(
+                email.subject, email.body, email.from_email,
+                email.recipients.split(','),
+                connection=mail_connection,
+            ).send()
+        except Exception as error:
+            failed += 1
+            email.last_error = f'{type(error).__name__}: {error}'
+            if email.attempts >= max_attempts:
+                email.status = OutgoingEmail.FAILED
+            else:
+                email.next_attempt_at = timezone.now() + timedelta(
+                    seconds=backoff * 2 ** (email.attempts - 1)
+                )
+        else:
+            sent += 1
+            email.status = OutgoingEmail.SENT
+            email.sent_at = timezone.now()
+        email.save(update_fields=(
+            'status', 'next_attempt_at', 'last_error', 'sent_at',
+        ))
+    if mail_connection is not None:
+        mail_connection.close()
+    return sent, failed
@@ -0,0 +1,139 @@
+"""
+Полнотекстовый поиск по названию и описанию произведений.
+SQLite: виртуальная таблица FTS5, синхронизируемая триггерами.
+PostgreSQL: GIN-индексы по tsvector и триграммам названия.
+Остальные базы: поиск подстроки в названии.
+"""
+import re
+
+from django.db import connections, transaction
+
+FTS_TABLE = 'reviews_title_fts'
+
+SQLITE_INSTALL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON reviews_title BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON reviews_title BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF name, description ON reviews_title BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+SQLITE_UNINSTALL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+POSTGRES_DOCUMENT = (
+    "to_tsvector('simple', {table}name || ' ' || {table}description)"
+)
+POSTGRES_INSTALL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS reviews_title_search_idx '
+    f'ON reviews_title USING gin ({POSTGRES_DOCUMENT.format(table="")})',
+    'CREATE INDEX IF NOT EXISTS reviews_title_name_trgm_idx '
+    'ON reviews_title USING gin (name gin_trgm_ops)',
+)
+POSTGRES_UNINSTALL = (
+    'DROP INDEX IF EXISTS reviews_title_search_idx',
+    'DROP INDEX IF EXISTS reviews_title_name_trgm_idx',
+)
+
+_fts_available = {}
+
+
+def install(schema_editor):
+    """
+    Создает поисковый индекс и заполняет его.
+    Операции идемпотентны: на SQLite их нужно повторять в миграциях,
+    которые пересоздают таблицу reviews_title, иначе пропадут триггеры.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                for sql in SQLITE_INSTALL:
+                    schema_editor.execute(sql)
+        except Exception:
+            # Сборка SQLite без FTS5: поиск работает по подстроке.
+            return
+    elif vendor == 'postgresql':
+        for sql in POSTGRES_INSTALL:
+            schema_editor.execute(sql)
+
+
+def uninstall(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sql in SQLITE_UNINSTALL:
+            schema_editor.execute(sql)
+    elif vendor == 'postgresql':
+        for sql in POSTGRES_UNINSTALL:
+            schema_editor.execute(sql)
+
+
+def fts_available(connection):
+    if connection.alias not in _fts_available:
+        with connection.cursor() as cursor:
+            _fts_available[connection.alias] = (
+                FTS_TABLE in connection.introspection.table_names(cursor)
+            )
+    return _fts_available[connection.alias]
+
+
+def search_titles(queryset, query):
+    """
+    Фильтрует произведения по поисковому запросу
+    и сортирует их по релевантности.
+    Каждое слово запроса ищется как префикс.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite' and fts_available(connection):
+        return queryset.extra(
+            select={'search_rank': f'{FTS_TABLE}.rank'},
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = reviews_title.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[' '.join(f'"{word}"*' for word in words)],
+            order_by=['search_rank'],
+        )
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        document = POSTGRES_DOCUMENT.format(table='reviews_title.')
+        return queryset.extra(
+            select={'search_rank': (
+                f"ts_rank({document}, to_tsquery('simple', %s))"
+                ' + similarity(reviews_title.name, %s)'
+            )},
+            select_params=[tsquery, query],
+            where=[
+                f"({document} @@ to_tsquery('simple', %s)"
+                ' OR reviews_title.name %% %s)'
+            ],
+            params=[tsquery, query],
+            order_by=['-search_rank'],
+        )
+    return queryset.filter(name__icontains=query)
@@ -0,0 +1,154 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, When
+from django.db.models.functions import Cast
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Category, Comment, Genre, Review, ScoreCount, Title, User
+from .versions import bump_versions
+
+VERSIONED_MODELS = (Category, Genre, Title, Review, Comment, User)
+
+
+RATING_FROM_SUM = Case(
+    When(rating_count=0, then=None),
+    default=(
+        Cast('rating_sum', FloatField())
+        / Cast('rating_count', FloatField())
+    ),
+    output_field=FloatField(),
+)
+
+
+def shift_rating(title_id, score_delta, count_delta):
+    """
+    Сдвигает сохраненные сумму и количество оценок произведения.
+    update() не отправляет сигналы, поэтому версия Title
+    увеличивается здесь: рейтинг отдают все ответы с произведениями.
+    """
+    titles = Title.objects.filter(pk=title_id)
+    with transaction.atomic():
+        titles.update(
+            rating_sum=F('rating_sum') + score_delta,
+            rating_count=F('rating_count') + count_delta,
+        )
+        titles.update(rating=RATING_FROM_SUM)
+    bump_versions(Title)
+
+
+def recount_rating(title_id):
+    """Пересчитывает рейтинг одного произведения по его отзывам."""
+    totals = Review.objects.filter(title_id=title_id).aggregate(
+        rating_sum=Sum('score'), rating_count=Count('id')
+    )
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=totals['rating_sum'] or 0,
+        rating_count=totals['rating_count'],
+        rating=(
+            totals['rating_sum'] / totals['rating_count']
+            if totals['rating_count'] else None
+        ),
+    )
+    bump_versions(Title)
+
+
+def shift_score_count(title_id, score, delta):
+    """Сдвигает количество оценок score в гистограмме произведения."""
+    counts = ScoreCount.objects.filter(title_id=title_id, score=score)
+    if counts.update(count=F('count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            ScoreCount.objects.create(
+                title_id=title_id, score=score, count=delta
+            )
+    except IntegrityError:
+        # Строку только что создал параллельный запрос.
+        counts.update(count=F('count') + delta)
+
+
+def recount_score_counts(title_id):
+    """Пересчитывает гистограмму оценок одного произведения."""
+    with transaction.atomic():
+        ScoreCount.objects.filter(title_id=title_id).delete()
+        ScoreCount.objects.bulk_create(
+            ScoreCount(title_id=title_id, score=row['score'],
+                       count=row['count'])
+            for row in Review.objects.filter(title_id=title_id).order_by(
+            ).values('score').annotate(count=Count('id'))
+        )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded_title_id = getattr(instance, '_loaded_title_id', None)
+    loaded_score = getattr(instance, '_loaded_score', None)
+    if created:
+        shift_rating(instance.title_id, instance.score, 1)
+        shift_score_count(instance.title_id, instance.score, 1)
+    elif loaded_title_id is None or loaded_score is None:
+        recount_rating(instance.title_id)
+        recount_score_counts(instance.title_id)
+    elif loaded_title_id != instance.title_id:
+        shift_rating(loaded_title_id, -loaded_score, -1)
+        shift_rating(instance.title_id, instance.score, 1)
+        shift_score_count(loaded_title_id, loaded_score, -1)
+        shift_score_count(instance.title_id, instance.score, 1)
+        bump_versions((Review, loaded_title_id))
+    elif loaded_score != instance.score:
+        shift_rating(instance.title_id, instance.score - loaded_score, 0)
+        shift_score_count(instance.title_id, loaded_score, -1)
+        shift_score_count(instance.title_id, instance.score, 1)
+    instance._loaded_title_id = instance.title_id
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    shift_rating(instance.title_id, -instance.score, -1)
+    shift_score_count(instance.title_id, instance.score, -1)
+
+
+@receiver((post_save, post_delete))
+def model_changed(sender, instance, **kwargs):
+    if sender is Review:
+        bump_versions((Review, instance.title_id))
+    elif sender is Comment:
+        bump_versions((Comment, instance.review_id))
+    elif sender is Title:
+        bump_versions((Title, instance.pk))
+    if sender in VERSIONED_MODELS:
+        bump_versions(sender)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_versions(Title)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    token_fields = tuple(
+        getattr(instance, field) for field in User.TOKEN_FIELDS
+    )
+    if (
+        not created
+        and getattr(instance, '_loaded_token_fields', None) != token_fields
+    ):
+        # Время изменения хранится в базе: отметка в кэше
+        # может быть вытеснена, а в другом процессе ее нет вовсе.
+        instance.token_fields_changed_at = timezone.now()
+        User.objects.filter(pk=instance.pk).update(
+            token_fields_changed_at=instance.token_fields_changed_at
+        )
+        bump_versions((User, instance.pk))
+    instance._loaded_token_fields = token_fields
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    bump_versions((User, instance.pk))
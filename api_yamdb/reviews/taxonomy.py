@@ -0,0 +1,75 @@
+"""
+Кэш категорий и жанров в памяти процесса.
+Таблицы маленькие и почти не меняются, а нужны почти в каждом запросе.
+Снимок таблицы перечитывается целиком, когда меняется версия модели
+из reviews.versions: ее увеличивают сигналы при любом сохранении
+и удалении, в том числе через API и админку.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Category, Genre
+from .versions import get_versions
+
+_snapshots = {}
+_lock = threading.Lock()
+
+
+class Taxonomy:
+    """Снимок таблицы: объекты по порядку модели, по id и по слагу."""
+
+    def __init__(self, objects, version):
+        self.objects = objects
+        self.version = version
+        self.by_id = {item.pk: item for item in objects}
+        self.by_slug = {item.slug: item for item in objects}
+        self.order = {item.pk: number for number, item in enumerate(objects)}
+
+    def ids(self, slugs):
+        """id по слагам, неизвестные слаги пропускаются."""
+        return [
+            self.by_slug[slug].pk for slug in slugs if slug in self.by_slug
+        ]
+
+    def sorted(self, ids):
+        """Объекты по id в порядке сортировки модели."""
+        return sorted(
+            (self.by_id[pk] for pk in ids if pk in self.by_id),
+            key=lambda item: self.order[item.pk],
+        )
+
+
+def taxonomy(model):
+    """
+    Актуальный снимок категорий или жанров.
+    Без общего кэша (DummyCache) версия неизвестна,
+    и таблица перечитывается при каждом обращении.
+    """
+    version, = get_versions(model)
+    snapshot = _snapshots.get(model)
+    if snapshot is not None and version is not None and (
+        snapshot.version == version
+    ):
+        return snapshot
+    with _lock:
+        snapshot = _snapshots.get(model)
+        if snapshot is None or version is None or (
+            snapshot.version != version
+        ):
+            # Версия прочитана до загрузки: изменение во время загрузки
+            # увеличит ее, и снимок перечитается при следующем обращении.
+            # Реплика может отставать, поэтому читается основная база.
+            snapshot = Taxonomy(
+                list(model.objects.using(DEFAULT_DB_ALIAS).all()), version
+            )
+            _snapshots[model] = snapshot
+    return snapshot
+
+
+def categories():
+    return taxonomy(Category)
+
+
+def genres():
+    return taxonomy(Genre)
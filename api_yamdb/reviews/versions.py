@@ -0,0 +1,84 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+MODIFIED_KEY = 'modified:{}'
+
+
+def version_name(item):
+    """
+    Имя версии: модель целиком или пара (модель, область),
+    например отзывы одного произведения.
+    """
+    if isinstance(item, tuple):
+        model, scope = item
+        return f'{model._meta.label_lower}:{scope}'
+    return item._meta.label_lower
+
+
+def initial_version():
+    """Начальная версия, не совпадающая с вытесненной из кэша."""
+    return int(time.time() * 1000)
+
+
+def get_versions(*items):
+    """Возвращает текущие версии моделей в порядке аргументов."""
+    keys = [VERSION_KEY.format(version_name(item)) for item in items]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def get_last_modified(*items):
+    """
+    Время последнего изменения моделей или None,
+    если оно не сохранилось в кэше.
+    """
+    keys = [MODIFIED_KEY.format(version_name(item)) for item in items]
+    modified = cache.get_many(keys)
+    if not keys or len(modified) < len(keys):
+        return None
+    return max(modified.values())
+
+
+def remember_last_modified(item, modified, timeout):
+    """
+    Сохраняет время изменения, известное из базы, если в кэше его нет.
+    Отметка от bump_versions не перезаписывается.
+    """
+    cache.add(
+        MODIFIED_KEY.format(version_name(item)), modified, timeout=timeout
+    )
+
+
+def get_last_change(*items):
+    """Время последнего известного изменения любой из моделей или None."""
+    keys = [MODIFIED_KEY.format(version_name(item)) for item in items]
+    return max(cache.get_many(keys).values(), default=None)
+
+
+def bump_versions(*items):
+    """
+    Увеличивает версии моделей после изменения их данных.
+    Внутри транзакции версии меняются только после ее фиксации:
+    иначе параллельный запрос успел бы закэшировать старые строки
+    под новой версией. При откате транзакции версии не меняются.
+    """
+    transaction.on_commit(lambda: _bump_versions(items))
+
+
+def _bump_versions(items):
+    now = time.time()
+    for item in items:
+        name = version_name(item)
+        key = VERSION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), timeout=None)
+        cache.set(MODIFIED_KEY.format(name), now, timeout=None)
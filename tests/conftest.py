@@ -0,0 +1,38 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.test import APIClient
+
+from reviews import taxonomy
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    """
+    Тест начинает с пустого кэша: внутри тестовой транзакции
+    on_commit не срабатывает, и версии моделей не увеличиваются.
+    """
+    cache.clear()
+    taxonomy._snapshots.clear()
+    yield
+    cache.clear()
+    taxonomy._snapshots.clear()
+
+
+@pytest.fixture
+def page_size(monkeypatch):
+    """Меняет размер страницы постраничной и курсорной пагинации."""
+    def set_page_size(size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', size)
+        monkeypatch.setattr(CursorPagination, 'page_size', size)
+    return set_page_size
+
+
+@pytest.fixture
+def api_client():
+    """Возвращает клиент API, авторизованный как переданный пользователь."""
+    def make_client(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+    return make_client
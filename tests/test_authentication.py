@@ -0,0 +1,73 @@
+import pytest
+
+from api.authentication import token_for_user
+from reviews.models import User
+
+URL = '/api/v1/cache/stats/'
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """Общий для процессов кэш, как в Docker-образе."""
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path),
+    }}
+
+
+def create_user(role):
+    return User.objects.create(username=role, email=f'{role}@example.com',
+                               role=role)
+
+
+def auth(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token_for_user(user)}'}
+
+
+@pytest.mark.django_db
+def test_role_from_claims_without_queries(client, shared_cache,
+                                          django_assert_num_queries):
+    """С общим кэшем роль берется из токена, когда отметка известна."""
+    admin = create_user(User.ADMIN)
+    # Первый запрос читает время изменения прав из базы.
+    assert client.get(URL, **auth(admin)).status_code == 200
+    with django_assert_num_queries(0):
+        assert client.get(URL, **auth(admin)).status_code == 200
+    moderator = create_user(User.MODERATOR)
+    client.get(URL, **auth(moderator))
+    with django_assert_num_queries(0):
+        assert client.get(URL, **auth(moderator)).status_code == 403
+
+
+@pytest.mark.django_db(transaction=True)
+def test_role_change_revokes_token(client, shared_cache):
+    """
+    Понижение роли и удаление пользователя действуют сразу.
+    Отметка изменения записывается после фиксации транзакции,
+    поэтому тест работает без общей транзакции.
+    """
+    admin = create_user(User.ADMIN)
+    headers = auth(admin)
+    assert client.get(URL, **headers).status_code == 200
+    assert client.get(URL, **headers).status_code == 200
+    admin.role = User.USER
+    admin.save()
+    assert client.get(URL, **headers).status_code == 403
+    admin.delete()
+    assert client.get(URL, **headers).status_code == 401
+
+
+@pytest.mark.django_db
+def test_process_local_cache_checks_database(client,
+                                             django_assert_num_queries):
+    """
+    С LocMemCache отметка другого процесса не видна, поэтому
+    пользователь загружается из базы при каждом запросе.
+    """
+    admin = create_user(User.ADMIN)
+    headers = auth(admin)
+    assert client.get(URL, **headers).status_code == 200
+    # Роль меняется как бы в другом процессе: без отметки в этом кэше.
+    User.objects.filter(pk=admin.pk).update(role=User.USER)
+    with django_assert_num_queries(1):
+        assert client.get(URL, **headers).status_code == 403
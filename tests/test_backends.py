@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+from psycopg2 import extensions, pool  # noqa: E402
+
+from api_yamdb.backends.postgresql_pool import base  # noqa: E402
+
+
+class FakeConnection:
+    closed = False
+
+    class info:
+        transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.info.transaction_status
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def blocking_pool(monkeypatch):
+    """Пул на одно соединение без настоящего сервера PostgreSQL."""
+    monkeypatch.setattr(pool.psycopg2, 'connect',
+                        lambda *args, **kwargs: FakeConnection())
+    return base.BlockingConnectionPool(1, 1, 0.5)
+
+
+def test_pool_waits_for_free_connection(blocking_pool):
+    first = blocking_pool.getconn()
+    got = []
+    waiter = threading.Thread(
+        target=lambda: got.append(blocking_pool.getconn())
+    )
+    waiter.start()
+    time.sleep(0.1)
+    assert not got
+    blocking_pool.putconn(first)
+    waiter.join()
+    assert got == [first]
+
+
+def test_pool_times_out(blocking_pool):
+    blocking_pool.timeout = 0.05
+    blocking_pool.getconn()
+    with pytest.raises(pool.PoolError):
+        blocking_pool.getconn()
+
+
+def test_pool_engine_never_keeps_connections():
+    wrapper = base.DatabaseWrapper({
+        'ENGINE': 'api_yamdb.backends.postgresql_pool', 'NAME': 'yamdb',
+        'CONN_MAX_AGE': 60, 'OPTIONS': {}, 'AUTOCOMMIT': True,
+        'TIME_ZONE': None,
+    })
+    assert wrapper.settings_dict['CONN_MAX_AGE'] == 0
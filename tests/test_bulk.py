@@ -0,0 +1,89 @@
+import pytest
+
+from reviews.models import Category, Genre, Title, User
+
+URL = '/api/v1/titles/bulk/'
+
+
+@pytest.fixture
+def admin_client(api_client):
+    return api_client(User.objects.create(
+        username='admin', email='admin@example.com', role=User.ADMIN
+    ))
+
+
+@pytest.fixture
+def taxonomy_rows():
+    Category.objects.create(name='Книги', slug='books')
+    Category.objects.create(name='Фильмы', slug='movies')
+    Genre.objects.create(name='Драма', slug='drama')
+    Genre.objects.create(name='Комедия', slug='comedy')
+
+
+def item(name, **fields):
+    return {'name': name, 'year': 2000, 'category': 'books',
+            'genre': ['drama'], **fields}
+
+
+@pytest.mark.django_db
+def test_bulk_create(client, admin_client, taxonomy_rows):
+    response = admin_client.post(URL, [
+        item('Первое'), item('Второе', genre=['comedy', 'drama']),
+    ], format='json')
+    assert response.status_code == 201
+    assert Title.objects.count() == 2
+    for result in response.json():
+        detail = client.get(f'/api/v1/titles/{result["id"]}/').json()
+        assert result == detail
+    assert [genre['slug'] for genre in response.json()[1]['genre']] == [
+        'drama', 'comedy'
+    ]
+
+
+@pytest.mark.django_db
+def test_bulk_update_only(client, admin_client, taxonomy_rows):
+    title = Title.objects.create(name='Старое', year=1999,
+                                 category=Category.objects.get(slug='books'))
+    response = admin_client.post(URL, [
+        item('Новое', id=title.id, category='movies', genre=['comedy']),
+    ], format='json')
+    assert response.status_code == 200
+    result, = response.json()
+    assert result == client.get(f'/api/v1/titles/{title.id}/').json()
+    assert result['name'] == 'Новое'
+    assert result['category']['slug'] == 'movies'
+    assert [genre['slug'] for genre in result['genre']] == ['comedy']
+    assert Title.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_item_errors_write_nothing(admin_client, taxonomy_rows):
+    response = admin_client.post(URL, [
+        item('Верное'),
+        item('Без категории', category='unknown'),
+        item('Чужое', id=999),
+    ], format='json')
+    assert response.status_code == 400
+    errors = response.json()['errors']
+    assert errors[0] is None
+    assert 'category' in errors[1]
+    assert 'id' in errors[2]
+    assert not Title.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_max(admin_client, taxonomy_rows, settings):
+    settings.TITLES_BULK_MAX = 2
+    items = [item(f'Произведение {number}') for number in range(3)]
+    response = admin_client.post(URL, items, format='json')
+    assert response.status_code == 400
+    assert not Title.objects.exists()
+    response = admin_client.post(URL, items[:2], format='json')
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+def test_bulk_requires_admin(api_client, taxonomy_rows):
+    user = User.objects.create(username='user', email='user@example.com')
+    response = api_client(user).post(URL, [item('Первое')], format='json')
+    assert response.status_code == 403
@@ -0,0 +1,71 @@
+import pytest
+
+from reviews.models import Category, Genre, Review, Title, User
+
+
+@pytest.fixture
+def title():
+    category = Category.objects.create(name='Книги', slug='books')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Произведение', year=2000,
+                                 category=category)
+    title.genre.set([genre])
+    author = User.objects.create(username='author',
+                                 email='author@example.com')
+    Review.objects.create(title=title, author=author, text='Отзыв', score=5)
+    return title
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query, error_field', (
+    ('fields=id,unknown', 'fields'),
+    ('fields=id&expand=unknown', 'expand'),
+    ('expand=category,unknown', 'expand'),
+))
+def test_unknown_titles_fields(client, title, query, error_field):
+    response = client.get(f'/api/v1/titles/?{query}')
+    assert response.status_code == 400
+    assert 'unknown' in str(response.json()[error_field])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query, error_field', (
+    ('fields=text,unknown', 'fields'),
+    ('expand=author', 'expand'),
+))
+def test_unknown_reviews_fields(client, title, query, error_field):
+    response = client.get(f'/api/v1/titles/{title.id}/reviews/?{query}')
+    assert response.status_code == 400
+    assert error_field in response.json()
+
+
+@pytest.mark.django_db
+def test_sparse_titles_list_queries(client, title,
+                                    django_assert_num_queries):
+    """Без категории и жанров в fields их снимки и жанры не загружаются."""
+    # COUNT(*) и произведения.
+    with django_assert_num_queries(2):
+        response = client.get('/api/v1/titles/?fields=id,name,rating')
+    assert response.status_code == 200
+    assert response.json()['results'] == [
+        {'id': title.id, 'name': title.name, 'rating': 5}
+    ]
+
+
+@pytest.mark.django_db
+def test_sparse_title_detail_queries(client, title,
+                                     django_assert_num_queries):
+    with django_assert_num_queries(1) as context:
+        response = client.get(f'/api/v1/titles/{title.id}/?fields=name')
+    assert response.json() == {'name': title.name}
+    assert '"reviews_title"."description"' not in context[0]['sql']
+
+
+@pytest.mark.django_db
+def test_sparse_fields_keep_expanded_relations(client, title):
+    response = client.get(
+        '/api/v1/titles/?fields=name,category,genre&expand=category'
+    )
+    result, = response.json()['results']
+    assert result['category'] == {'name': 'Книги', 'slug': 'books'}
+    assert result['genre'] == ['drama']
@@ -0,0 +1,130 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Title
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\S+$')
+
+
+@pytest.fixture
+def titles():
+    """
+    Произведения 1990–2009 годов с рейтингом от 1 до 10:
+    четные — драмы, кратные трем — еще и комедии.
+    """
+    books = Category.objects.create(name='Книги', slug='books')
+    movies = Category.objects.create(name='Фильмы', slug='movies')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    titles = []
+    for number in range(20):
+        title = Title.objects.create(
+            name=f'Произведение {number:02}', year=1990 + number,
+            category=books if number % 2 else movies,
+        )
+        title.genre.set(
+            ([drama] if number % 2 == 0 else [])
+            + ([comedy] if number % 3 == 0 else [])
+        )
+        titles.append(title)
+    for number, title in enumerate(titles):
+        Title.objects.filter(pk=title.pk).update(rating=number % 10 + 1)
+    return titles
+
+
+def names(client, query):
+    response = client.get(f'/api/v1/titles/?{query}&fields=name')
+    assert response.status_code == 200
+    return {title['name'] for title in response.json()['results']}
+
+
+def expected(titles, condition):
+    return {title.name for title in titles if condition(title)}
+
+
+@pytest.mark.django_db
+def test_genre_any_and_all(client, titles, page_size):
+    page_size(len(titles))
+    assert names(client, 'genre=drama,comedy') == expected(
+        titles,
+        lambda title: (title.year - 1990) % 2 == 0
+        or (title.year - 1990) % 3 == 0,
+    )
+    assert names(client, 'genre=drama,comedy&genre_mode=any') == names(
+        client, 'genre=drama,comedy'
+    )
+    assert names(client, 'genre=drama,comedy&genre_mode=all') == {
+        'Произведение 00', 'Произведение 06',
+        'Произведение 12', 'Произведение 18',
+    }
+
+
+@pytest.mark.django_db
+def test_rating_range(client, titles, page_size):
+    page_size(len(titles))
+    assert names(client, 'rating_min=4&rating_max=5') == {
+        'Произведение 03', 'Произведение 04',
+        'Произведение 13', 'Произведение 14',
+    }
+
+
+@pytest.mark.django_db
+def test_year_range(client, titles, page_size):
+    page_size(len(titles))
+    assert names(client, 'year__gte=2000&year__lte=2002') == expected(
+        titles, lambda title: 2000 <= title.year <= 2002
+    )
+    assert names(client, 'year__gte=2008') == expected(
+        titles, lambda title: title.year >= 2008
+    )
+
+
+def title_plans(client, query):
+    """Планы EXPLAIN QUERY PLAN запросов к произведениям из ответа."""
+    with CaptureQueriesContext(connection) as context:
+        assert client.get(f'/api/v1/titles/?{query}').status_code == 200
+    plans = []
+    for captured in context.captured_queries:
+        sql = captured['sql']
+        if not sql.startswith('SELECT') or 'FROM "reviews_title"' not in sql:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+    assert plans
+    return plans
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite',
+                    reason='Планы проверяются для SQLite')
+@pytest.mark.django_db
+@pytest.mark.parametrize('query, index', (
+    ('category=books&ordering=name', 'title_category_name_idx'),
+    ('category=books&ordering=-rating', 'title_category_rating_idx'),
+    ('category=books&ordering=year', 'title_category_year_idx'),
+    ('ordering=rating_count', 'title_rating_count_idx'),
+    ('ordering=-rating', None),
+    ('ordering=year', None),
+    ('genre=drama', 'title_genre_genre_title_idx'),
+    ('genre=drama,comedy&genre_mode=all', 'title_genre_genre_title_idx'),
+    ('category=books&genre=comedy&ordering=-rating',
+     'title_genre_genre_title_idx'),
+    ('year__gte=2000&year__lte=2005', None),
+    ('rating_min=3&rating_max=7', None),
+))
+def test_title_filters_use_indexes(client, titles, query, index):
+    """
+    Фильтры и сортировки читают индексы: полных проходов по таблице нет,
+    а сортировка по полю индекса обходится без временного B-дерева.
+    """
+    plans = title_plans(client, query)
+    for sql, plan in plans:
+        assert not any(FULL_SCAN.match(row) for row in plan), (sql, plan)
+        if 'ordering=' in query and 'ORDER BY' in sql:
+            assert not any('TEMP B-TREE FOR ORDER BY' in row
+                           for row in plan), (sql, plan)
+    if index:
+        assert any(index in row for _, plan in plans for row in plan), plans
@@ -0,0 +1,58 @@
+import csv
+import os
+import shutil
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+
+from reviews.models import Comment, ImportCheckpoint, Review, Title, User
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+
+
+def count_rows(name):
+    with open(os.path.join(DATA_DIR, name), encoding='utf-8') as file:
+        return sum(1 for _ in csv.DictReader(file))
+
+
+def checkpoints():
+    return set(ImportCheckpoint.objects.values_list('filename', flat=True))
+
+
+@pytest.mark.django_db
+def test_only_loads_missing_dependencies():
+    """--only подгружает незагруженные файлы, от которых зависят указанные."""
+    call_command('importcsv', '--only', 'review.csv', 'comments.csv')
+    assert Review.objects.count() == count_rows('review.csv')
+    assert Comment.objects.count() == count_rows('comments.csv')
+    assert checkpoints() == {
+        'category.csv', 'users.csv', 'titles.csv', 'review.csv',
+        'comments.csv',
+    }
+    assert Title.objects.filter(rating_count__gt=0).exists()
+
+
+@pytest.mark.django_db
+def test_resume_loads_remaining_files():
+    """Повторный запуск загружает только файлы без отметки."""
+    call_command('importcsv', '--only', 'category.csv', 'users.csv')
+    call_command('importcsv')
+    assert User.objects.count() == count_rows('users.csv')
+    assert Title.objects.count() == count_rows('titles.csv')
+    assert Review.objects.count() == count_rows('review.csv')
+    assert len(checkpoints()) == 7
+
+
+@pytest.mark.django_db
+def test_file_with_broken_references_is_not_checkpointed(tmp_path):
+    """Файл со ссылками на несуществующие записи не отмечается."""
+    data_dir = tmp_path / 'data'
+    shutil.copytree(DATA_DIR, data_dir)
+    with open(data_dir / 'review.csv', 'a', encoding='utf-8') as file:
+        file.write('9999,9999,Отзыв,1,5,2019-09-24T21:08:21.567Z\n')
+    with pytest.raises(CommandError, match='review.csv'):
+        call_command('importcsv', '--path', str(data_dir))
+    assert 'review.csv' not in checkpoints()
+    assert 'titles.csv' in checkpoints()
+    assert not Review.objects.exists()
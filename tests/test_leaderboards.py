@@ -0,0 +1,40 @@
+import pytest
+
+from reviews.leaderboards import refresh_leaderboards
+from reviews.models import Category, Review, Title, User
+
+
+@pytest.mark.django_db(transaction=True)
+def test_review_write_changes_leaderboard(client):
+    """
+    Изменение отзыва меняет ETag и рейтинг в ответе рейтингов.
+    Версии увеличиваются после фиксации транзакции, поэтому тест
+    работает без общей транзакции.
+    """
+    category = Category.objects.create(name='Книги', slug='books')
+    title = Title.objects.create(name='Произведение', year=2000,
+                                 category=category)
+    reviews = [
+        Review.objects.create(
+            title=title, text='Отзыв', score=score,
+            author=User.objects.create(username=f'user{score}',
+                                       email=f'user{score}@example.com'),
+        )
+        for score in (4, 8)
+    ]
+    refresh_leaderboards(min_reviews=1)
+    url = '/api/v1/leaderboards/?board=most_reviewed'
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert response.json()[0]['title']['rating'] == 6
+
+    reviews[0].score = 2
+    reviews[0].save()
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.json()[0]['title']['rating'] == 5
+    detail = client.get(f'/api/v1/titles/{title.id}/').json()
+    assert detail['rating'] == 5
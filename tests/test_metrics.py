@@ -0,0 +1,51 @@
+import pytest
+
+from api.authentication import token_for_user
+from reviews.models import User
+
+URL = '/metrics'
+
+
+def bearer(token):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+@pytest.mark.django_db
+def test_metrics_closed_by_default(client):
+    assert client.get(URL).status_code == 401
+
+
+@pytest.mark.django_db
+def test_metrics_public_opt_in(client, settings):
+    settings.METRICS_PUBLIC = True
+    response = client.get(URL)
+    assert response.status_code == 200
+    assert b'yamdb_requests' in response.content
+
+
+@pytest.mark.django_db
+def test_metrics_token(client, settings):
+    settings.METRICS_TOKEN = 'secret'
+    assert client.get(URL, **bearer('secret')).status_code == 200
+    assert client.get(URL, **bearer('wrong')).status_code == 401
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('role, status_code', (
+    (User.ADMIN, 200),
+    (User.MODERATOR, 401),
+    (User.USER, 401),
+))
+def test_metrics_for_jwt_users(client, role, status_code):
+    user = User.objects.create(username=role, email=f'{role}@example.com',
+                               role=role)
+    response = client.get(URL, **bearer(token_for_user(user)))
+    assert response.status_code == status_code
+
+
+@pytest.mark.django_db
+def test_metrics_for_admin_session(client):
+    admin = User.objects.create(username='admin', email='admin@example.com',
+                                role=User.ADMIN)
+    client.force_login(admin)
+    assert client.get(URL).status_code == 200
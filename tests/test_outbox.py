@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+from reviews.outbox import claim_batch, deliver_batch, enqueue_mail
+
+
+@pytest.fixture
+def outbox(settings):
+    settings.EMAIL_DELIVERY = 'outbox'
+    return [
+        enqueue_mail('Код', 'Код подтверждения', 'from@example.com',
+                     [f'user{number}@example.com'])
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def failing_mail(monkeypatch):
+    def send(message, fail_silently=False):
+        raise ConnectionRefusedError('почтовый сервер недоступен')
+    monkeypatch.setattr(EmailMessage, 'send', send)
+
+
+def make_due(*emails):
+    """Переносит следующую попытку в прошлое, как будто время прошло."""
+    OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+        next_attempt_at=timezone.now() - timedelta(seconds=1)
+    )
+
+
+def seconds_until_attempt(email):
+    email.refresh_from_db()
+    return (email.next_attempt_at - timezone.now()).total_seconds()
+
+
+@pytest.mark.django_db
+def test_claim_leases_emails(outbox):
+    claimed = claim_batch(2, lease=300)
+    assert [email.pk for email in claimed] == [
+        email.pk for email in outbox[:2]
+    ]
+    for email in claimed:
+        assert email.attempts == 1
+        assert 295 < seconds_until_attempt(email) <= 300
+    # Взятые письма не достаются следующему обработчику до конца lease.
+    assert [email.pk for email in claim_batch(10, lease=300)] == [
+        outbox[2].pk
+    ]
+    assert claim_batch(10, lease=300) == []
+    make_due(*outbox)
+    assert len(claim_batch(10, lease=300)) == 3
+
+
+@pytest.mark.django_db
+def test_deliver_sends_outside_claim(outbox):
+    assert deliver_batch(10) == (3, 0)
+    assert len(mail.outbox) == 3
+    assert set(OutgoingEmail.objects.values_list('status', flat=True)) == {
+        OutgoingEmail.SENT
+    }
+    assert deliver_batch(10) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_failed_email_backs_off_then_fails(outbox, failing_mail):
+    email = outbox[0]
+    OutgoingEmail.objects.exclude(pk=email.pk).delete()
+    assert deliver_batch(1, max_attempts=3, backoff=30) == (0, 1)
+    email.refresh_from_db()
+    assert email.status == OutgoingEmail.PENDING
+    assert 'ConnectionRefusedError' in email.last_error
+    assert 25 < seconds_until_attempt(email) <= 30
+
+    make_due(email)
+    deliver_batch(1, max_attempts=3, backoff=30)
+    assert 55 < seconds_until_attempt(email) <= 60
+    assert email.attempts == 2
+
+    make_due(email)
+    deliver_batch(1, max_attempts=3, backoff=30)
+    email.refresh_from_db()
+    assert email.status == OutgoingEmail.FAILED
+    assert email.attempts == 3
+    make_due(email)
+    assert email.pk not in [claimed.pk for claimed in claim_batch(10, 300)]
@@ -0,0 +1,222 @@
+import pytest
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Count, Sum
+
+from reviews.models import (Category, Comment, Review, ScoreCount, Title,
+                            User)
+
+ROWS = 5
+MODES = ('', '?pagination=cursor')
+
+
+def create_users(count):
+    return [
+        User.objects.create(username=f'user{number}',
+                            email=f'user{number}@example.com')
+        for number in range(count)
+    ]
+
+
+@pytest.fixture
+def title():
+    category = Category.objects.create(name='Книги', slug='books')
+    return Title.objects.create(name='Произведение', year=2000,
+                                category=category)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('rows', (ROWS, 2 * ROWS))
+def test_reviews_page_queries(client, title, page_size,
+                              django_assert_num_queries, rows, mode):
+    """Авторы отзывов загружаются вместе с отзывами."""
+    page_size(2 * ROWS)
+    for number, author in enumerate(create_users(rows)):
+        Review.objects.create(title=title, author=author,
+                              text=f'Отзыв {number}', score=5)
+    # Произведение, COUNT(*) без курсора и отзывы с авторами.
+    with django_assert_num_queries(2 if mode else 3):
+        response = client.get(f'/api/v1/titles/{title.id}/reviews/{mode}')
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == rows
+    assert all(review['author'] for review in results)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('rows', (ROWS, 2 * ROWS))
+def test_comments_page_queries(client, title, page_size,
+                               django_assert_num_queries, rows, mode):
+    """Авторы комментариев загружаются вместе с комментариями."""
+    page_size(2 * ROWS)
+    users = create_users(rows)
+    review = Review.objects.create(title=title, author=users[0],
+                                   text='Отзыв', score=5)
+    for number, author in enumerate(users):
+        Comment.objects.create(review=review, author=author,
+                               text=f'Комментарий {number}')
+    # Отзыв, COUNT(*) без курсора и комментарии с авторами.
+    with django_assert_num_queries(2 if mode else 3):
+        response = client.get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/{mode}'
+        )
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == rows
+    assert all(comment['author'] for comment in results)
+
+
+def assert_rating_matches_reviews(*titles):
+    """Сохраненные рейтинг и гистограмма совпадают с пересчетом."""
+    for title in titles:
+        title.refresh_from_db()
+        reviews = Review.objects.filter(title=title)
+        totals = reviews.aggregate(rating_sum=Sum('score'),
+                                   rating_count=Count('id'))
+        assert title.rating_sum == (totals['rating_sum'] or 0)
+        assert title.rating_count == totals['rating_count']
+        assert title.rating == (
+            totals['rating_sum'] / totals['rating_count']
+            if totals['rating_count'] else None
+        )
+        histogram = dict(
+            ScoreCount.objects.filter(title=title, count__gt=0)
+            .values_list('score', 'count')
+        )
+        assert histogram == dict(
+            reviews.order_by().values('score').annotate(count=Count('id'))
+            .values_list('score', 'count')
+        )
+
+
+@pytest.mark.django_db
+def test_rating_follows_review_changes(title, api_client):
+    """
+    Рейтинг и гистограмма верны после создания, изменения,
+    переноса и удаления отзывов.
+    """
+    other = Title.objects.create(name='Другое', year=2000,
+                                 category=title.category)
+    users = create_users(3)
+    url = f'/api/v1/titles/{title.id}/reviews/'
+    for user, score in zip(users, (3, 7, 10)):
+        response = api_client(user).post(
+            url, {'text': 'Отзыв', 'score': score}
+        )
+        assert response.status_code == 201
+    assert_rating_matches_reviews(title, other)
+
+    review = Review.objects.get(author=users[0])
+    response = api_client(users[0]).patch(f'{url}{review.id}/',
+                                          {'score': 8})
+    assert response.status_code == 200
+    assert_rating_matches_reviews(title, other)
+
+    review.refresh_from_db()
+    review.title = other
+    review.save()
+    assert_rating_matches_reviews(title, other)
+
+    review = Review.objects.get(author=users[1])
+    response = api_client(users[1]).delete(f'{url}{review.id}/')
+    assert response.status_code == 204
+    assert_rating_matches_reviews(title, other)
+
+
+@pytest.mark.django_db
+def test_update_of_stale_review_uses_current_score(title, api_client,
+                                                   monkeypatch):
+    """
+    Если отзыв изменили после того, как запрос его прочитал,
+    рейтинг сдвигается от оценки в базе, а не от прочитанной.
+    """
+    from api.views import ReviewViewSet
+
+    user, = create_users(1)
+    review = Review.objects.create(title=title, author=user, text='Отзыв',
+                                   score=5)
+    get_object = ReviewViewSet.get_object
+
+    def get_stale_object(view):
+        stale = get_object(view)
+        Review.objects.filter(pk=review.pk).update(score=9)
+        Title.objects.filter(pk=title.pk).update(rating_sum=9)
+        ScoreCount.objects.filter(title=title).update(score=9)
+        return stale
+
+    monkeypatch.setattr(ReviewViewSet, 'get_object', get_stale_object)
+    response = api_client(user).patch(
+        f'/api/v1/titles/{title.id}/reviews/{review.id}/', {'score': 2}
+    )
+    assert response.status_code == 200
+    assert_rating_matches_reviews(title)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reviews_etag_ignores_other_titles_and_users(client, title):
+    """
+    Ответы отзывов и комментариев не устаревают от изменений других
+    произведений и пользователей, но устаревают от своих.
+    Версии увеличиваются после фиксации транзакции, поэтому тест
+    работает без общей транзакции.
+    """
+    other = Title.objects.create(name='Другое', year=2000,
+                                 category=title.category)
+    first, second = create_users(2)
+    review = Review.objects.create(title=title, author=first, text='Отзыв',
+                                   score=5)
+    other_review = Review.objects.create(title=other, author=first,
+                                         text='Отзыв', score=5)
+    reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+    comments_url = f'{reviews_url}{review.id}/comments/'
+    etags = {url: client.get(url)['ETag']
+             for url in (reviews_url, comments_url)}
+
+    User.objects.create(username='newcomer', email='newcomer@example.com')
+    second.bio = 'Новая биография'
+    second.save()
+    other.name = 'Переименованное'
+    other.save()
+    Comment.objects.create(review=other_review, author=second, text='Да')
+    for url, etag in etags.items():
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    review.text = 'Исправленный отзыв'
+    review.save()
+    for url, etag in etags.items():
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_second_review_is_rejected(title, api_client):
+    user, = create_users(1)
+    url = f'/api/v1/titles/{title.id}/reviews/'
+    client = api_client(user)
+    assert client.post(url, {'text': 'Отзыв', 'score': 5}).status_code == 201
+    response = client.post(url, {'text': 'Еще отзыв', 'score': 7})
+    assert response.status_code == 400
+    assert response.json() == {
+        'non_field_errors': [settings.MESSAGE_REVIEW_EXISTS]
+    }
+    assert Review.objects.get().score == 5
+
+
+@pytest.mark.django_db
+def test_other_integrity_errors_are_not_reported_as_duplicates(
+    title, api_client, monkeypatch
+):
+    """Нарушение внешнего ключа не выдается за повторный отзыв."""
+    from api.serializers import ReviewCreateSerializer
+
+    def save(serializer, **kwargs):
+        raise IntegrityError('FOREIGN KEY constraint failed')
+
+    monkeypatch.setattr(ReviewCreateSerializer, 'save', save)
+    user, = create_users(1)
+    with pytest.raises(IntegrityError):
+        api_client(user).post(f'/api/v1/titles/{title.id}/reviews/',
+                              {'text': 'Отзыв', 'score': 5})
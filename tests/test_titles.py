@@ -0,0 +1,58 @@
+import pytest
+
+from reviews.models import Category, Genre, Title
+
+PAGE_SIZES = (5, 10)
+
+
+@pytest.fixture
+def titles():
+    categories = [
+        Category.objects.create(name=f'Категория {number}',
+                                slug=f'category-{number}')
+        for number in range(3)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {number}', slug=f'genre-{number}')
+        for number in range(4)
+    ]
+    titles = []
+    for number in range(2 * max(PAGE_SIZES)):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000,
+            category=categories[number % len(categories)],
+        )
+        title.genre.set(genres[:number % len(genres) + 1])
+        titles.append(title)
+    return titles
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', PAGE_SIZES)
+def test_titles_list_queries(client, titles, page_size,
+                             django_assert_num_queries, size):
+    """
+    Количество запросов не зависит от размера страницы:
+    категории и жанры загружаются снимками, жанры страницы — одним запросом.
+    """
+    page_size(size)
+    # Снимки категорий и жанров, COUNT(*), произведения и их жанры.
+    with django_assert_num_queries(5):
+        response = client.get('/api/v1/titles/')
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == size
+    assert all(title['category'] and title['genre'] for title in results)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('genre_count', (1, 4))
+def test_title_retrieve_queries(client, titles, django_assert_num_queries,
+                                genre_count):
+    """Количество запросов не зависит от количества жанров произведения."""
+    title = titles[genre_count - 1]
+    # Снимки категорий и жанров, произведение и его жанры.
+    with django_assert_num_queries(4):
+        response = client.get(f'/api/v1/titles/{title.id}/')
+    assert response.status_code == 200
+    assert len(response.json()['genre']) == genre_count